@@ -0,0 +1,69 @@
+'''compare save latency with the incremental autosaver'''
+
+# Run this in RoboFont's scripting window with
+# Booster installed or with source/code on sys.path.
+
+import os
+import time
+import shutil
+import tempfile
+from mojo.roboFont import RFont
+from booster.autosave import SharedAutosaver
+
+# number of glyphs in the test font
+glyphCount = 6000
+
+# number of glyphs edited between autosaves
+editCount = 20
+
+def drawGlyph(glyph, index):
+    pen = glyph.getPen()
+    for i in range(3):
+        offset = index % 50 + i * 100
+        pen.moveTo((offset, 0))
+        pen.lineTo((offset, 700))
+        pen.curveTo((offset + 50, 750), (offset + 100, 750), (offset + 150, 700))
+        pen.lineTo((offset + 150, 0))
+        pen.closePath()
+    glyph.width = 500
+    glyph.unicodes = [0xE000 + index]
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, "Benchmark.ufo")
+
+font = RFont(showInterface=False)
+for index in range(glyphCount):
+    drawGlyph(font.newGlyph("glyph%d" % index), index)
+
+start = time.time()
+font.save(path)
+print("font.save (main thread): %.3f s" % (time.time() - start))
+
+autosaver = SharedAutosaver()
+autosaver.addFont(font)
+
+start = time.time()
+autosaver.autosave()
+snapshot = time.time() - start
+autosaver.waitUntilDone()
+total = time.time() - start
+print("first autosave: %.3f s on the main thread, %.3f s total" % (snapshot, total))
+
+names = font.glyphOrder[:editCount]
+for name in names:
+    font[name].moveBy((10, 0))
+
+start = time.time()
+autosaver.autosave()
+snapshot = time.time() - start
+autosaver.waitUntilDone()
+total = time.time() - start
+print("incremental autosave of %d glyphs: %.4f s on the main thread, %.4f s total" % (editCount, snapshot, total))
+
+start = time.time()
+font.save()
+print("font.save after the same edit (main thread): %.3f s" % (time.time() - start))
+
+autosaver.removeFont(font)
+font.close()
+shutil.rmtree(directory)
@@ -0,0 +1,57 @@
+'''measure the font observation dispatch cost with many fonts and observers'''
+
+# Run this in RoboFont's scripting window with
+# Booster installed or with source/code on sys.path.
+
+import time
+import timeit
+from defcon import Font
+from booster.controller import BoosterController
+
+# number of fonts
+fontCount = 50
+# number of observers per font
+observerCount = 20
+# number of notifications posted per font
+posts = 100
+
+
+class Controller(BoosterController):
+
+    identifier = "com.typesupply.Booster.benchmark.fontObservation"
+
+
+class Observer(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def fontChanged(self, notification):
+        self.count += 1
+
+
+controller = Controller()
+fonts = [Font() for i in range(fontCount)]
+observers = []
+
+start = time.time()
+for font in fonts:
+    for i in range(observerCount):
+        observer = Observer()
+        controller.addFontObserver(font, observer, "fontChanged", "Font.Changed")
+        observers.append(observer)
+print("add: %.3f ms" % ((time.time() - start) * 1000))
+
+def postAll():
+    for font in fonts:
+        font.postNotification("Font.Changed")
+
+total = timeit.timeit(postAll, number=posts)
+print("dispatch: %.3f ms per notification" % (total / (posts * fontCount) * 1000))
+print("delivered: %d" % sum(observer.count for observer in observers))
+
+# Dropping the observers must empty the table
+# without any explicit removal.
+del observers[:]
+del observer
+print("entries left after dropping the observers: %d" % len(controller._fontObservations))
@@ -0,0 +1,24 @@
+'''compare the per-tick cost of the idle time sources'''
+
+# Run this in RoboFont's scripting window with
+# Booster installed or with source/code on sys.path.
+
+import timeit
+from booster.activity import IOKitIdleTimeSource, SubprocessIdleTimeSource
+
+# number of simulated poller ticks per source
+ticks = 200
+
+sources = [
+    ("ioreg subprocess", SubprocessIdleTimeSource()),
+    ("IOKit in process", IOKitIdleTimeSource())
+]
+
+results = {}
+for name, source in sources:
+    total = timeit.timeit(source.idleTime, number=ticks)
+    results[name] = total / ticks
+    print("%s: %.3f ms per tick" % (name, results[name] * 1000))
+
+print()
+print("speedup: %.0fx" % (results["ioreg subprocess"] / results["IOKit in process"]))
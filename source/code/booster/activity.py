@@ -8,22 +8,44 @@ all Booster based extensions. The main methods are
 addObserver_ and removeObserver_. See below for
 details on these.
 
-The polling and notification precision tries to
-be 0.01 seconds. However, since this is polling,
-don't rely on a specific level of precision.
-Also, keep in mind that each poll is a relatively
-inefficient and expensive operation. Too much
-polling will slow performance.
+By default the poller is event driven. User activity
+is recorded by monitoring the application's input
+events and font activity is recorded by observing
+the open fonts. The poller only wakes up when the
+next observer threshold can be crossed, so nothing
+is done while the user is working. If the poller
+is not event driven, user activity is read from
+the idle time source and the poller has to check
+back every polling interval while it is waiting
+for new activity.
+
+The notification precision tries to be 0.01 seconds.
+However, the timers are scheduled with some tolerance,
+so don't rely on a specific level of precision.
+
+-------------------
+SharedChangeJournal
+-------------------
+
+This function returns the journal of font changes
+recorded by the activity poller's font observer.
+See ChangeJournal below for details.
 """
 
 from __future__ import division
 import time
+import heapq
 import re
 import subprocess
 import weakref
-from collections import OrderedDict
+from collections import OrderedDict, deque, namedtuple
 from Foundation import NSObject, NSTimer
-from AppKit import NSApp, NSNotificationCenter
+from AppKit import NSApp, NSNotificationCenter, NSEvent, \
+    NSEventMaskKeyDown, NSEventMaskKeyUp, NSEventMaskFlagsChanged, \
+    NSEventMaskLeftMouseDown, NSEventMaskLeftMouseUp, NSEventMaskLeftMouseDragged, \
+    NSEventMaskRightMouseDown, NSEventMaskRightMouseUp, NSEventMaskRightMouseDragged, \
+    NSEventMaskOtherMouseDown, NSEventMaskOtherMouseUp, NSEventMaskOtherMouseDragged, \
+    NSEventMaskMouseMoved, NSEventMaskScrollWheel
 from objc import super
 from mojo.events import addObserver, removeObserver
 from mojo.roboFont import AllFonts
@@ -36,6 +58,25 @@ from .debug import ClassNameIncrementer
 def getDefaultPollingInterval():
     return 2.0
 
+minimumWakeUpInterval = 0.01
+
+userEventMask = (
+    NSEventMaskKeyDown
+    | NSEventMaskKeyUp
+    | NSEventMaskFlagsChanged
+    | NSEventMaskLeftMouseDown
+    | NSEventMaskLeftMouseUp
+    | NSEventMaskLeftMouseDragged
+    | NSEventMaskRightMouseDown
+    | NSEventMaskRightMouseUp
+    | NSEventMaskRightMouseDragged
+    | NSEventMaskOtherMouseDown
+    | NSEventMaskOtherMouseUp
+    | NSEventMaskOtherMouseDragged
+    | NSEventMaskMouseMoved
+    | NSEventMaskScrollWheel
+)
+
 # -------
 # Monitor
 # -------
@@ -43,13 +84,25 @@ def getDefaultPollingInterval():
 class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
 
     _timer = None
+    _timerDeadline = None
     _interval = getDefaultPollingInterval()
     _lastPoll = None
     _resignedActiveTime = None
+    _active = False
+    _suspended = False
+    _eventDriven = True
+    _eventMonitor = None
+    _lastUserActivityTime = None
+    _lastActivityStamps = None
 
     def init(self):
         self = super(ActivityPoller, self).init()
         self._observers = OrderedDict()
+        self._deadlines = []
+        self._deadlineCounter = 0
+        self._waitingForActivity = set()
+        self._waitingForFontActivity = {}
+        self._waitingForAppState = {True : set(), False : set()}
         nc = NSNotificationCenter.defaultCenter()
         nc.addObserver_selector_name_object_(
             self,
@@ -57,53 +110,133 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
             "NSApplicationDidResignActiveNotification",
             NSApp()
         )
+        nc.addObserver_selector_name_object_(
+            self,
+            "_appBecameActiveNotificationCallback:",
+            "NSApplicationDidBecomeActiveNotification",
+            NSApp()
+        )
         return self
 
     def dealloc(self):
         nc = NSNotificationCenter.defaultCenter()
-        app.removeObserver_name_object_(
+        nc.removeObserver_name_object_(
             self,
             "NSApplicationDidResignActiveNotification",
             NSApp()
         )
+        nc.removeObserver_name_object_(
+            self,
+            "NSApplicationDidBecomeActiveNotification",
+            NSApp()
+        )
         super(ActivityPoller, self).dealloc()
 
     def _appResignedActiveNotificationCallback_(self, notification):
         self._resignedActiveTime = time.time()
+        self._appActiveStateDidChange()
+
+    def _appBecameActiveNotificationCallback_(self, notification):
+        self._lastUserActivityTime = time.time()
+        self._appActiveStateDidChange()
+
+    def _appActiveStateDidChange(self):
+        # observers that were waiting for a specific
+        # app state may be able to fire now.
+        # the change also ends the current inactive period.
+        appIsActive = bool(NSApp().isActive())
+        waiting = self._waitingForAppState[appIsActive]
+        if waiting:
+            now = time.time()
+            for key in list(waiting):
+                self._scheduleObserver_deadline_(key, now)
+        self._releaseObserversWaitingForActivity()
+        self._rescheduleTimer()
 
     # -----
     # Timer
     # -----
 
-    def _startTimer(self):
+    def _startTimer_(self, interval):
+        interval = max(interval, minimumWakeUpInterval)
+        self._timerDeadline = time.time() + interval
         self._timer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-            self._interval,
+            interval,
             self,
             "_timerCallback:",
             None,
             False
         )
-        self._timer.setTolerance_(0.25)
+        self._timer.setTolerance_(min(0.25, interval * 0.1))
 
     def _stopTimer(self):
         if self._timer is not None:
             self._timer.invalidate()
             self._timer = None
+            self._timerDeadline = None
+
+    def _rescheduleTimer(self):
+        if not self.polling():
+            self._stopTimer()
+            return
+        if self._shouldSuspend():
+            self._suspend()
+            return
+        self._resume()
+        deadline = self._earliestDeadline()
+        if not self._eventDriven and (self._waitingForActivity or self._waitingForFontActivity):
+            # New activity can only be found by checking
+            # back every polling interval.
+            pollDeadline = time.time() + self._interval
+            if deadline is None or pollDeadline < deadline:
+                deadline = pollDeadline
+        if deadline is None:
+            # Nothing can fire until there is new activity.
+            # The activity will wake the poller.
+            self._stopTimer()
+            return
+        if self._timerDeadline is not None and abs(self._timerDeadline - deadline) < minimumWakeUpInterval:
+            return
+        self._stopTimer()
+        self._startTimer_(deadline - time.time())
 
     def _timerCallback_(self, timer):
-        idle = False
+        self._timer = None
+        self._timerDeadline = None
+        info = self._gatherActivityInfo()
+        if not self._eventDriven:
+            stamps = (info["endedUserActivity"], info["endedFontActivity"])
+            if stamps != self._lastActivityStamps:
+                self._lastActivityStamps = stamps
+                self._releaseObserversWaitingForActivity()
+        self._processDueObserversWithInfo_(info)
+        # Restart
+        self._rescheduleTimer()
+
+    def activityInfo(self):
+        """
+        Get the current activity info. This is a dict with
+        the structure that is given to observers. See
+        addObserver_ for details.
+        """
+        return self._gatherActivityInfo()
+
+    def _gatherActivityInfo(self):
+        now = time.time()
         # App activity
         app = NSApp()
         appIsActive = app.isActive()
         # Font activity
         sinceFontActivity, endedFontActivity = _fontObserver.fontIdleTime()
         # User activity
-        if appIsActive:
-            sinceUserActivity, endedUserActivity = userIdleTime()
-        else:
+        if not appIsActive and self._resignedActiveTime is not None:
             endedUserActivity = self._resignedActiveTime
-            sinceUserActivity = time.time() - endedUserActivity
-        # Notify observers
+            sinceUserActivity = now - endedUserActivity
+        elif self._eventDriven:
+            endedUserActivity = self._lastUserActivityTime
+            sinceUserActivity = now - endedUserActivity
+        else:
+            sinceUserActivity, endedUserActivity = userIdleTime()
         info = dict(
             appIsActive=appIsActive,
             sinceUserActivity=sinceUserActivity,
@@ -111,10 +244,109 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
             sinceFontActivity=sinceFontActivity,
             endedFontActivity=endedFontActivity
         )
-        self._notifyObserversWithInfo_(info)
-        # Restart
-        if self.polling():
-            self._startTimer()
+        return info
+
+    # --------
+    # Activity
+    # --------
+
+    """
+    Observers that have been notified about the previous
+    inactive period can fire again once new activity has
+    occurred. User activity releases all of them. Font
+    activity releases the observers that are not limited
+    to a font and the observers limited to that font.
+    """
+
+    def _userActivityDidOccur(self):
+        if self._waitingForActivity or self._waitingForFontActivity:
+            self._releaseObserversWaitingForActivity()
+            self._rescheduleTimer()
+
+    def _fontActivityDidOccur_(self, font):
+        fontRef = weakref.ref(font)
+        if self._waitingForActivity or fontRef in self._waitingForFontActivity:
+            self._releaseObserversWaitingForFontActivity_(fontRef)
+            self._rescheduleTimer()
+
+    def _releaseObserversWaitingForActivity(self):
+        now = time.time()
+        waiting = list(self._waitingForActivity)
+        for fontWaiting in self._waitingForFontActivity.values():
+            waiting.extend(fontWaiting)
+        for key in waiting:
+            self._scheduleObserver_deadline_(key, now)
+
+    def _releaseObserversWaitingForFontActivity_(self, fontRef):
+        now = time.time()
+        waiting = list(self._waitingForActivity)
+        waiting.extend(self._waitingForFontActivity.get(fontRef, ()))
+        for key in waiting:
+            self._scheduleObserver_deadline_(key, now)
+
+    def _userEventMonitorCallback_(self, event):
+        self._lastUserActivityTime = time.time()
+        self._userActivityDidOccur()
+        return event
+
+    def _startEventMonitor(self):
+        if self._eventMonitor is not None:
+            return
+        if self._lastUserActivityTime is None:
+            sinceUserActivity, endedUserActivity = userIdleTime()
+            self._lastUserActivityTime = endedUserActivity
+        self._eventMonitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(
+            userEventMask,
+            self._userEventMonitorCallback_
+        )
+
+    def _stopEventMonitor(self):
+        if self._eventMonitor is not None:
+            NSEvent.removeMonitor_(self._eventMonitor)
+            self._eventMonitor = None
+
+    # ----------
+    # Suspension
+    # ----------
+
+    """
+    When every observer is waiting for the app to change
+    its active state, nothing can be posted until that
+    happens. The timer, the event monitor and the font
+    observation are torn down until the app state changes
+    or an observer is added. Font activity that occurs
+    while suspended is not tracked, so resuming counts
+    as font activity.
+    """
+
+    def suspended(self):
+        """
+        Returns a boolean indicating if the poller has
+        been suspended because no observer can be notified
+        in the current app state.
+        """
+        return self._suspended
+
+    def _shouldSuspend(self):
+        appIsActive = bool(NSApp().isActive())
+        waiting = self._waitingForAppState[not appIsActive]
+        return bool(waiting) and len(waiting) == len(self._observers)
+
+    def _suspend(self):
+        if self._suspended:
+            return
+        self._suspended = True
+        _fontObserver.stopObserving()
+        self._stopEventMonitor()
+        self._stopTimer()
+
+    def _resume(self):
+        if not self._suspended:
+            return
+        self._suspended = False
+        _fontObserver.startObserving()
+        if self._eventDriven:
+            self._startEventMonitor()
 
     # -------
     # Polling
@@ -125,40 +357,82 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
         Returns a boolean indicating if the poller is
         actively monitoring for inactivity.
         """
-        if self._timer is not None:
-            return self._timer.isValid()
-        else:
-            return False
+        return self._active
 
     def startPolling(self):
         """
         Start polling. This should not be called externally
         unless you have a really good reason to do so.
         """
+        if self._active:
+            return
+        self._active = True
         _fontObserver.startObserving()
-        self._startTimer()
+        if self._eventDriven:
+            self._startEventMonitor()
+        self._rescheduleTimer()
 
     def stopPolling(self):
         """
         Stop polling. This should not be called externally
         unless you have a really good reason to do so.
         """
-        _fontObserver.stopObserving()
+        if not self._active:
+            return
+        self._active = False
+        if self._suspended:
+            self._suspended = False
+        else:
+            _fontObserver.stopObserving()
+        self._stopEventMonitor()
         self._stopTimer()
 
     def setInterval_(self, value):
         """
-        Set the polling interval.
+        Set the polling interval. This is used when the
+        poller is waiting for new activity and it is
+        not event driven.
         """
         self._interval = value
-        if self.polling():
+        self._rescheduleTimer()
+
+    def eventDriven(self):
+        """
+        Returns a boolean indicating if user activity is
+        tracked by monitoring application events.
+        """
+        return self._eventDriven
+
+    def setEventDriven_(self, value):
+        """
+        Set whether user activity is tracked by monitoring
+        application events (True) or by polling the idle
+        time source (False).
+        """
+        value = bool(value)
+        if value == self._eventDriven:
+            return
+        polling = self.polling()
+        if polling:
             self.stopPolling()
+        self._eventDriven = value
+        if polling:
             self.startPolling()
 
     # ---------
     # Observers
     # ---------
 
+    """
+    The observers are kept in a heap ordered by the earliest
+    time at which each observer could possibly be notified.
+    The timer sleeps until the earliest deadline and only
+    the observers with passed deadlines are evaluated.
+    Observers that can't be notified until there is new
+    activity, or until the app changes its active state,
+    are parked outside of the heap until that happens.
+    """
+
     def addObserver_(self, info):
         """
         Add an observer. The gist is that you define how much
@@ -181,6 +455,9 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
                                 Optional. The default is 2.0 seconds.
             sinceFontActivity : Seconds of font processing inactivity.
                                 Optional. The default is 2.0 seconds.
+                         font : A font. If given, only activity in this font
+                                counts as font activity for this observer.
+                                Optional. The default is None.
                        repeat : Boolean indicating if the notification should
                                 be posted repeatedly during an inactive period.
                                 Optional. The default is False.
@@ -200,32 +477,38 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
             sinceFontActivity : Seconds since the last font activity.
             endedFontActivity : When the last font activity occured.
             }
+
+        If the observer was added with a font, the font
+        activity values only refer to that font.
         """
         observer = info["observer"]
         observer = weakref.ref(observer)
         selector = info["selector"]
+        key = (observer, selector)
+        font = info.get("font")
+        if font is not None:
+            if hasattr(font, "naked"):
+                font = font.naked()
+            font = weakref.ref(font)
         value = dict(
+            font=font,
             appIsActive=info.get("appIsActive"),
             sinceUserActivity=info.get("sinceUserActivity"),
             sinceFontActivity=info.get("sinceFontActivity"),
             repeat=info.get("repeat", False),
             notifiedFontActivity=None,
-            notifiedUserActivity=None
+            notifiedUserActivity=None,
+            entry=None
         )
-        self._observers[observer, selector] = value
-        intervals = []
-        for info in self._observers.values():
-            if "sinceUserActivity" in info:
-                intervals.append(info["sinceUserActivity"])
-            if "sinceUserActivity" in info:
-                intervals.append(info["sinceFontActivity"])
-        if not intervals:
-            self._interval = getDefaultPollingInterval()
-        else:
-            self._interval = min(intervals)
+        if key in self._observers:
+            self._unparkObserver_(key)
+        self._observers[key] = value
+        self._updateInterval()
+        self._scheduleObserver_deadline_(key, time.time())
         if self.polling():
-            self.stopPolling()
-        self.startPolling()
+            self._rescheduleTimer()
+        else:
+            self.startPolling()
 
     def removeObserver_(self, info):
         """
@@ -235,47 +518,166 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
         observer = info["observer"]
         observer = weakref.ref(observer)
         selector = info["selector"]
-        del self._observers[observer, selector]
+        key = (observer, selector)
+        self._unparkObserver_(key)
+        del self._observers[key]
+        self._updateInterval()
         if not self._observers:
             self.stopPolling()
+        # stale heap entries are skipped when they surface
+        # but there is no reason to keep them around.
+        elif len(self._deadlines) > 2 * len(self._observers):
+            self._compactDeadlines()
 
-    def _notifyObserversWithInfo_(self, info):
+    def _updateInterval(self):
+        intervals = []
+        for value in self._observers.values():
+            for k in ("sinceUserActivity", "sinceFontActivity"):
+                interval = value[k]
+                if interval:
+                    intervals.append(interval)
+        if not intervals:
+            self._interval = getDefaultPollingInterval()
+        else:
+            self._interval = min(intervals)
+
+    def _scheduleObserver_deadline_(self, key, deadline):
+        self._unparkObserver_(key)
+        value = self._observers[key]
+        self._deadlineCounter += 1
+        entry = (deadline, self._deadlineCounter, key)
+        value["entry"] = entry
+        heapq.heappush(self._deadlines, entry)
+
+    def _parkObserver_waitingFor_(self, key, waiting):
+        value = self._observers[key]
+        value["entry"] = None
+        waiting.add(key)
+
+    def _parkObserverUntilActivity_(self, key):
+        fontRef = self._observers[key]["font"]
+        if fontRef is None:
+            waiting = self._waitingForActivity
+        else:
+            waiting = self._waitingForFontActivity.setdefault(fontRef, set())
+        self._parkObserver_waitingFor_(key, waiting)
+
+    def _unparkObserver_(self, key):
+        self._waitingForActivity.discard(key)
+        value = self._observers.get(key)
+        if value is not None and value["font"] is not None:
+            fontRef = value["font"]
+            waiting = self._waitingForFontActivity.get(fontRef)
+            if waiting is not None:
+                waiting.discard(key)
+                if not waiting:
+                    del self._waitingForFontActivity[fontRef]
+        self._waitingForAppState[True].discard(key)
+        self._waitingForAppState[False].discard(key)
+
+    def _entryIsCurrent_(self, entry):
+        value = self._observers.get(entry[2])
+        if value is None:
+            return False
+        return value["entry"] is entry
+
+    def _earliestDeadline(self):
+        deadlines = self._deadlines
+        while deadlines:
+            entry = deadlines[0]
+            if self._entryIsCurrent_(entry):
+                return entry[0]
+            heapq.heappop(deadlines)
+        return None
+
+    def _compactDeadlines(self):
+        self._deadlines = [entry for entry in self._deadlines if self._entryIsCurrent_(entry)]
+        heapq.heapify(self._deadlines)
+
+    def _processDueObserversWithInfo_(self, info):
         now = time.time()
         appIsActive = info["appIsActive"]
         sinceUserActivity = info["sinceUserActivity"]
         endedUserActivity = info["endedUserActivity"]
-        sinceFontActivity = info["sinceFontActivity"]
-        endedFontActivity = info["endedFontActivity"]
-        for (observer, selector), value in self._observers.items():
+        deadlines = self._deadlines
+        # Collect first so that observers rescheduled
+        # while processing are not seen twice.
+        due = []
+        while deadlines and deadlines[0][0] <= now + minimumWakeUpInterval:
+            entry = heapq.heappop(deadlines)
+            if self._entryIsCurrent_(entry):
+                due.append(entry)
+        for entry in due:
+            # removed or rescheduled by an earlier callback
+            if not self._entryIsCurrent_(entry):
+                continue
+            key = entry[2]
+            value = self._observers[key]
+            observer, selector = key
+            # font limited observer
+            observerInfo = info
+            sinceFontActivity = info["sinceFontActivity"]
+            endedFontActivity = info["endedFontActivity"]
+            fontRef = value["font"]
+            if fontRef is not None:
+                font = fontRef()
+                if font is None:
+                    self._unparkObserver_(key)
+                    del self._observers[key]
+                    continue
+                sinceFontActivity, endedFontActivity = _fontObserver.fontIdleTime(font)
+                observerInfo = dict(info)
+                observerInfo["sinceFontActivity"] = sinceFontActivity
+                observerInfo["endedFontActivity"] = endedFontActivity
             desiredAppIsActive = value["appIsActive"]
-            desiredUserActivity = value["sinceUserActivity"]
-            desiredFontActivity = value["sinceFontActivity"]
+            desiredUserActivity = value["sinceUserActivity"] or 0
+            desiredFontActivity = value["sinceFontActivity"] or 0
             repeat = value["repeat"]
-            notifiedUserActivity = value["notifiedUserActivity"]
-            notifiedFontActivity = value["notifiedFontActivity"]
             # app not in desired active state
             if desiredAppIsActive is not None:
                 if desiredAppIsActive != appIsActive:
+                    self._parkObserver_waitingFor_(key, self._waitingForAppState[desiredAppIsActive])
                     continue
-            # too recent user activity
-            if desiredUserActivity:
-                if desiredUserActivity > sinceUserActivity:
-                    continue
-            # too recent font activity
-            if desiredFontActivity:
-                if desiredFontActivity > sinceFontActivity:
-                    continue
+            # too recent user or font activity
+            wait = max(
+                desiredUserActivity - sinceUserActivity,
+                desiredFontActivity - sinceFontActivity
+            )
+            if wait > 0:
+                self._scheduleObserver_deadline_(key, now + wait)
+                continue
             # don't want repeat and already notified
             if not repeat:
-                if notifiedUserActivity == endedUserActivity and notifiedFontActivity == endedFontActivity:
+                if value["notifiedUserActivity"] == endedUserActivity and value["notifiedFontActivity"] == endedFontActivity:
+                    self._parkObserverUntilActivity_(key)
                     continue
-            # notify
+            # dead observer
             observer = observer()
-            meth = getattr(observer, selector)
-            meth(info)
+            if observer is None:
+                self._unparkObserver_(key)
+                del self._observers[key]
+                continue
+            # reschedule before notifying so that the
+            # callback is free to remove the observer.
+            if repeat:
+                # repeat at the shortest threshold
+                # defined by the observer.
+                thresholds = [i for i in (desiredUserActivity, desiredFontActivity) if i]
+                if thresholds:
+                    interval = min(thresholds)
+                else:
+                    interval = self._interval
+                self._scheduleObserver_deadline_(key, now + interval)
+            else:
+                self._parkObserverUntilActivity_(key)
             # store repeat stamp
             value["notifiedUserActivity"] = endedUserActivity
             value["notifiedFontActivity"] = endedFontActivity
+            # notify
+            meth = getattr(observer, selector)
+            meth(observerInfo)
+        if not self._observers and self.polling():
+            self.stopPolling()
 
 
 # -------------
@@ -285,16 +687,38 @@ class ActivityPoller(NSObject, metaclass=ClassNameIncrementer):
 class _FontObserver(object):
 
     _lastNotificationTime = None
+    _startedObservingTime = None
 
-    def fontIdleTime(self):
-        if self._lastNotificationTime is None:
-            return 0
-        length = time.time() - self._lastNotificationTime
-        began = self._lastNotificationTime
+    def __init__(self):
+        self._fontNotificationTimes = weakref.WeakKeyDictionary()
+        self._observedFonts = weakref.WeakSet()
+        self._observingCount = 0
+
+    def fontIdleTime(self, font=None):
+        """
+        Get the time since the last change in any font
+        or, if font is given, in that font.
+        """
+        if font is None:
+            began = self._lastNotificationTime
+        else:
+            began = self._fontNotificationTimes.get(font, self._startedObservingTime)
+        if began is None:
+            return 0, None
+        length = time.time() - began
         return length, began
 
+    """
+    The observer is shared by the activity poller and the
+    change journal cursors. It keeps observing while any
+    of them needs it.
+    """
+
     def startObserving(self):
-        self._lastNotificationTime = time.time()
+        self._observingCount += 1
+        if self._observingCount > 1:
+            return
+        self._lastNotificationTime = self._startedObservingTime = time.time()
         openEvents = [
             "newFontDidOpen",
             "fontDidOpen"
@@ -311,10 +735,16 @@ class _FontObserver(object):
             "fontWillClose"
         )
         for font in AllFonts():
-            self._fontDidOpenEventCallback(dict(font=font))
+            self.observeFont(font.naked())
 
     def stopObserving(self):
-        self._lastNotificationTime = None
+        if self._observingCount == 0:
+            return
+        self._observingCount -= 1
+        if self._observingCount > 0:
+            return
+        self._lastNotificationTime = self._startedObservingTime = None
+        self._fontNotificationTimes.clear()
         openEvents = [
             "newFontDidOpen",
             "fontDidOpen"
@@ -328,57 +758,433 @@ class _FontObserver(object):
             self,
             "fontWillClose"
         )
-        for font in AllFonts():
-            self._fontWillCloseEventCallback(dict(font=font))
+        for font in list(self._observedFonts):
+            self.unobserveFont(font)
 
-    # Event Callbacks
-
-    def _fontDidOpenEventCallback(self, info):
-        font = info["font"]
+    def observeFont(self, font):
+        """
+        Observe a defcon font. Fonts with an interface are
+        observed automatically. Fonts without an interface
+        must be given to this while observing.
+        """
+        if font in self._observedFonts:
+            return
+        self._observedFonts.add(font)
         font.addObserver(
             self,
             "_fontChangeNotificationCallback",
             "Font.Changed"
         )
+        dispatcher = font.dispatcher
+        for notification in journalNotifications:
+            dispatcher.addObserver(
+                observer=self,
+                methodName="_journalNotificationCallback",
+                notification=notification,
+                observable=None
+            )
 
-    def _fontWillCloseEventCallback(self, info):
-        font = info["font"]
+    def unobserveFont(self, font):
+        """
+        Stop observing a defcon font.
+        """
+        self._fontNotificationTimes.pop(font, None)
+        if font not in self._observedFonts:
+            return
+        self._observedFonts.remove(font)
         font.removeObserver(
             self,
             "Font.Changed"
         )
+        dispatcher = font.dispatcher
+        for notification in journalNotifications:
+            dispatcher.removeObserver(
+                observer=self,
+                notification=notification,
+                observable=None
+            )
+
+    # Event Callbacks
+
+    def _fontDidOpenEventCallback(self, info):
+        font = info["font"]
+        self.observeFont(font.naked())
+
+    def _fontWillCloseEventCallback(self, info):
+        font = info["font"]
+        self.unobserveFont(font.naked())
 
     # Font Callbacks
 
     def _fontChangeNotificationCallback(self, notification):
-        self._lastNotificationTime = time.time()
+        font = notification.object
+        self._lastNotificationTime = self._fontNotificationTimes[font] = time.time()
+        _activityPoller._fontActivityDidOccur_(font)
+
+    def _journalNotificationCallback(self, notification):
+        name = notification.name
+        kind = journalNotifications[name]
+        obj = notification.object
+        layer = glyph = None
+        if name.startswith("Glyph."):
+            if obj.layer is None:
+                return
+            layer = obj.layer.name
+            glyph = obj.name
+        elif name.startswith("Layer."):
+            layer = obj.name
+            glyph = notification.data["name"]
+        font = obj.font
+        if font is None:
+            return
+        fontRef = weakref.ref(font)
+        if name == "Glyph.NameChanged":
+            _changeJournal._append(fontRef, layer, notification.data["oldValue"], kind)
+        _changeJournal._append(fontRef, layer, glyph, kind)
+
+
+# --------------
+# Change Journal
+# --------------
+
+"""
+The font observer writes a record to a bounded journal
+for each change in the fonts. Consumers keep a cursor
+into the journal and ask for the changes since their
+cursor, so they only need to process what has actually
+changed. The journal is only written while the font
+observer is running. Making a cursor keeps it running
+until the cursor is closed.
+"""
+
+journalNotifications = {
+    "Glyph.Changed" : "glyphChanged",
+    "Glyph.NameChanged" : "glyphNameChanged",
+    "Layer.GlyphAdded" : "glyphAdded",
+    "Layer.GlyphDeleted" : "glyphDeleted",
+    "Info.Changed" : "infoChanged",
+    "Groups.Changed" : "groupsChanged",
+    "Kerning.Changed" : "kerningChanged",
+    "Features.Changed" : "featuresChanged"
+}
+
+def getDefaultJournalSize():
+    return 10000
+
+
+class ChangeRecord(namedtuple("ChangeRecord", "fontRef layer glyph kind time")):
+    """
+    A journal record. layer and glyph are names and
+    they are None for changes that are not glyph changes.
+    kind is one of the values in journalNotifications.
+    glyphNameChanged records are written for both the
+    old and the new name.
+    """
+
+    __slots__ = ()
+
+    def _get_font(self):
+        return self.fontRef()
+
+    font = property(_get_font)
+
+
+class ChangeJournal(object):
+
+    def __init__(self, size=None):
+        if size is None:
+            size = getDefaultJournalSize()
+        self._records = deque(maxlen=size)
+        self._nextCursor = 0
+
+    def _append(self, fontRef, layer, glyph, kind):
+        self._records.append(ChangeRecord(fontRef, layer, glyph, kind, time.time()))
+        self._nextCursor += 1
+
+    def getCursor(self):
+        """
+        Get the cursor that will be given to the next record.
+        """
+        return self._nextCursor
+
+    def getChangesSince(self, cursor, font=None, compact=False):
+        """
+        Get the changes that have been recorded since cursor.
+
+        font: if given, only changes in this font are returned.
+        compact: if True, only the most recent record for each
+                 (font, layer, glyph, kind) is returned.
+
+        This returns (records, cursor, complete). cursor is
+        the cursor to use for the next call. complete will
+        be False if records older than cursor have been
+        dropped from the journal. In that case the consumer
+        has missed changes and should rescan everything.
+        """
+        records = self._records
+        first = self._nextCursor - len(records)
+        complete = cursor >= first
+        count = self._nextCursor - max(cursor, first)
+        if count <= 0:
+            return [], self._nextCursor, complete
+        # walk back from the end so the cost is
+        # proportional to the number of changes.
+        changes = []
+        reverse = reversed(records)
+        for i in range(count):
+            changes.append(next(reverse))
+        changes.reverse()
+        if font is not None:
+            if hasattr(font, "naked"):
+                font = font.naked()
+            changes = [record for record in changes if record.fontRef() is font]
+        if compact:
+            latest = OrderedDict()
+            for record in changes:
+                key = (record.fontRef, record.layer, record.glyph, record.kind)
+                if key in latest:
+                    del latest[key]
+                latest[key] = record
+            changes = list(latest.values())
+        return changes, self._nextCursor, complete
+
+    def makeCursor(self, font=None):
+        """
+        Make a ChangeJournalCursor starting at the current
+        end of the journal. Close the cursor when it is
+        no longer needed. If font is given, the cursor
+        only returns changes in that font and the font
+        is observed even if it doesn't have an interface.
+        """
+        return ChangeJournalCursor(self, font=font)
+
+
+class ChangeJournalCursor(object):
+
+    def __init__(self, journal, font=None):
+        if font is not None and hasattr(font, "naked"):
+            font = font.naked()
+        self._journal = journal
+        self._font = font
+        self._closed = False
+        self.cursor = journal.getCursor()
+        _fontObserver.startObserving()
+        if font is not None:
+            _fontObserver.observeFont(font)
+
+    def __del__(self):
+        self.close()
+
+    def getChanges(self, compact=True):
+        """
+        Get the changes since the last call and advance
+        the cursor. This returns (records, complete).
+        See ChangeJournal.getChangesSince for details.
+        """
+        records, self.cursor, complete = self._journal.getChangesSince(
+            self.cursor,
+            font=self._font,
+            compact=compact
+        )
+        return records, complete
+
+    def close(self):
+        """
+        Close the cursor.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        _fontObserver.stopObserving()
 
 
 # ---------------------
 # Idle Time Calculation
 # ---------------------
 
+"""
+The user idle time is read from an idle time source.
+A source is any object with an idleTime method that
+returns the number of seconds since the last user
+input event. The default source reads the value
+directly from IOKit. Use setIdleTimeSource to
+install a different source.
+"""
+
 idleTimePattern = re.compile(r"\"HIDIdleTime\"\s*=\s*(\d+)")
 nanoToSec = 10 ** 9
 
-def userIdleTime():
-    # http://stackoverflow.com/questions/2425087/testing-for-inactivity-in-python-on-mac
-    s = subprocess.Popen(
-        ["ioreg", "-c", "IOHIDSystem"], stdout=subprocess.PIPE
-    ).communicate()[0]
-    s = s.decode("UTF-8")
-    times = idleTimePattern.findall(s)
-    if not times:
+class IdleTimeSource(object):
+    """
+    Base class for idle time sources. Subclasses
+    override idleTime. This base source never
+    reports any idle time.
+    """
+
+    def idleTime(self):
+        """
+        Return the number of seconds since the
+        last user input event. Subclasses override
+        this. The default returns 0.
+        """
         return 0
-    times = [int(t) / nanoToSec for t in times]
-    length = min(times)
+
+
+class IOKitIdleTimeSource(IdleTimeSource):
+    """
+    Reads HIDIdleTime from the IOHIDSystem service
+    in process. The service and the property key are
+    looked up once so that each read is a single
+    registry property fetch.
+    """
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        iokitPath = ctypes.util.find_library("IOKit")
+        cfPath = ctypes.util.find_library("CoreFoundation")
+        if iokitPath is None or cfPath is None:
+            raise OSError("IOKit is not available.")
+        iokit = ctypes.cdll.LoadLibrary(iokitPath)
+        cf = ctypes.cdll.LoadLibrary(cfPath)
+        iokit.IOServiceMatching.restype = ctypes.c_void_p
+        iokit.IOServiceMatching.argtypes = [ctypes.c_char_p]
+        iokit.IOServiceGetMatchingService.restype = ctypes.c_uint32
+        iokit.IOServiceGetMatchingService.argtypes = [ctypes.c_uint32, ctypes.c_void_p]
+        iokit.IORegistryEntryCreateCFProperty.restype = ctypes.c_void_p
+        iokit.IORegistryEntryCreateCFProperty.argtypes = [ctypes.c_uint32, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32]
+        iokit.IOObjectRelease.argtypes = [ctypes.c_uint32]
+        cf.CFStringCreateWithCString.restype = ctypes.c_void_p
+        cf.CFStringCreateWithCString.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_uint32]
+        cf.CFGetTypeID.restype = ctypes.c_ulong
+        cf.CFGetTypeID.argtypes = [ctypes.c_void_p]
+        cf.CFNumberGetTypeID.restype = ctypes.c_ulong
+        cf.CFNumberGetValue.restype = ctypes.c_bool
+        cf.CFNumberGetValue.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+        cf.CFRelease.argtypes = [ctypes.c_void_p]
+        # IOServiceGetMatchingService consumes the matching dictionary.
+        matching = iokit.IOServiceMatching(b"IOHIDSystem")
+        service = iokit.IOServiceGetMatchingService(0, matching)
+        if not service:
+            raise OSError("The IOHIDSystem service could not be found.")
+        kCFStringEncodingUTF8 = 0x08000100
+        self._ctypes = ctypes
+        self._iokit = iokit
+        self._cf = cf
+        self._service = service
+        self._key = cf.CFStringCreateWithCString(None, b"HIDIdleTime", kCFStringEncodingUTF8)
+        self._numberTypeID = cf.CFNumberGetTypeID()
+        self._value = ctypes.c_int64()
+        self._valuePointer = ctypes.byref(self._value)
+
+    def __del__(self):
+        if getattr(self, "_service", None):
+            self._iokit.IOObjectRelease(self._service)
+            self._cf.CFRelease(self._key)
+            self._service = None
+
+    def idleTime(self):
+        kCFNumberSInt64Type = 4
+        ref = self._iokit.IORegistryEntryCreateCFProperty(self._service, self._key, None, 0)
+        if not ref:
+            return 0
+        try:
+            if self._cf.CFGetTypeID(ref) != self._numberTypeID:
+                return 0
+            if not self._cf.CFNumberGetValue(ref, kCFNumberSInt64Type, self._valuePointer):
+                return 0
+            return self._value.value / nanoToSec
+        finally:
+            self._cf.CFRelease(ref)
+
+
+class SubprocessIdleTimeSource(IdleTimeSource):
+    """
+    Reads HIDIdleTime by running ioreg in a subprocess.
+    This is slow. It is only kept as a fallback for
+    systems where IOKit can't be loaded with ctypes.
+    """
+
+    def idleTime(self):
+        # http://stackoverflow.com/questions/2425087/testing-for-inactivity-in-python-on-mac
+        s = subprocess.Popen(
+            ["ioreg", "-c", "IOHIDSystem"], stdout=subprocess.PIPE
+        ).communicate()[0]
+        s = s.decode("UTF-8")
+        times = idleTimePattern.findall(s)
+        if not times:
+            return 0
+        times = [int(t) / nanoToSec for t in times]
+        return min(times)
+
+
+class FakeIdleTimeSource(IdleTimeSource):
+    """
+    An idle time source that is driven by hand.
+    This is for running without a window server,
+    for example in tests or headless scripts.
+    Call userDidAct to simulate user input.
+    """
+
+    def __init__(self):
+        self._lastActivity = time.time()
+
+    def userDidAct(self):
+        self._lastActivity = time.time()
+
+    def setIdleTime(self, value):
+        self._lastActivity = time.time() - value
+
+    def idleTime(self):
+        return time.time() - self._lastActivity
+
+
+def _makeDefaultIdleTimeSource():
+    try:
+        return IOKitIdleTimeSource()
+    except (OSError, AttributeError):
+        pass
+    try:
+        subprocess.check_call(
+            ["ioreg", "-c", "IOHIDSystem", "-d", "1"],
+            stdout=subprocess.DEVNULL
+        )
+        return SubprocessIdleTimeSource()
+    except (OSError, subprocess.CalledProcessError):
+        return FakeIdleTimeSource()
+
+_idleTimeSource = None
+
+def getIdleTimeSource():
+    """
+    Get the idle time source used by userIdleTime.
+    """
+    global _idleTimeSource
+    if _idleTimeSource is None:
+        _idleTimeSource = _makeDefaultIdleTimeSource()
+    return _idleTimeSource
+
+def setIdleTimeSource(source):
+    """
+    Set the idle time source used by userIdleTime.
+    Passing None restores the default source.
+    """
+    global _idleTimeSource
+    _idleTimeSource = source
+
+def userIdleTime():
+    length = getIdleTimeSource().idleTime()
     began = round(time.time() - length, 2) # round to hundredth of second to limit expected precision
     return length, began
 
 # Main
 
 _fontObserver = _FontObserver()
+_changeJournal = ChangeJournal()
 _activityPoller = ActivityPoller.alloc().init()
 
 def SharedActivityPoller():
     return _activityPoller
+
+def SharedChangeJournal():
+    return _changeJournal
@@ -0,0 +1,489 @@
+"""
+---------------
+SharedAutosaver
+---------------
+
+This function returns the autosaver shared by all Booster
+based extensions. Autosaving is opt-in per font:
+
+    SharedAutosaver().addFont(font)
+
+When the user and the fonts have been inactive for a while,
+the autosaver takes a snapshot of the data that has changed
+since the previous autosave and writes it to disk on a
+background thread. Only the snapshot is made on the main
+thread. Glyphs are snapshot as GLIF text and the changed
+glyphs are found in the SharedChangeJournal, so the cost
+is proportional to the edit, not to the size of the font.
+
+The data is written to a recovery copy of the font. This is
+a UFO 3 next to the font named "<name> (Autosave).ufo"
+unless another path is given. The font's own file is never
+touched. Writing it behind defcon's back would leave defcon's
+view of the file out of sync with the file. Each file in the
+recovery copy is replaced atomically. The first autosave of
+a font writes the whole font. After that, only the changed
+glyphs, the changed font level data and the font lib are
+written. Images and the data directory are not written.
+
+The autosaver posts bstr.autosaveDidFinish on the main thread
+after each write. The data is a dict with this structure:
+
+    {
+            path : The path of the recovery copy.
+        complete : Boolean indicating if the whole font was written.
+          glyphs : The number of glyph files written or removed.
+        duration : Seconds spent writing.
+    }
+"""
+
+import os
+import time
+import copy
+import shutil
+import weakref
+import plistlib
+import threading
+import traceback
+import queue
+from fontTools.ufoLib import fontInfoAttributesVersion3
+from fontTools.ufoLib.filenames import userNameToFileName
+from fontTools.ufoLib.glifLib import writeGlyphToString
+from PyObjCTools.AppHelper import callAfter
+from .activity import SharedActivityPoller, SharedChangeJournal
+from .manager import SharedFontManager
+from .notifications import BoosterNotificationMixin
+
+# --------
+# Defaults
+# --------
+
+def getDefaultIdleTime():
+    return 5.0
+
+def makeAutosavePath(path):
+    base, ext = os.path.splitext(path)
+    return base + " (Autosave)" + ext
+
+fontDataKinds = {
+    "infoChanged" : "info",
+    "groupsChanged" : "groups",
+    "kerningChanged" : "kerning",
+    "featuresChanged" : "features"
+}
+
+defaultLayerDirectory = "glyphs"
+
+# ---------
+# Autosaver
+# ---------
+
+class BoosterAutosaver(BoosterNotificationMixin):
+
+    def __init__(self):
+        self._fonts = {}
+        self._idleTime = getDefaultIdleTime()
+        self._observing = False
+        self._jobs = queue.Queue()
+        self._writer = None
+
+    # -----
+    # Fonts
+    # -----
+
+    def addFont(self, font, path=None):
+        """
+        Start autosaving a font.
+
+        path: the path for the recovery copy. Optional
+              if the font has a path.
+        """
+        if hasattr(font, "naked"):
+            font = font.naked()
+        if path is None:
+            if font.path is None:
+                raise ValueError("A path must be given for fonts that have not been saved.")
+            path = makeAutosavePath(font.path)
+        fontRef = weakref.ref(font)
+        if fontRef in self._fonts:
+            self.removeFont(font)
+        self._fonts[fontRef] = _AutosaveState(font, path)
+        self._startObserving()
+
+    def removeFont(self, font):
+        """
+        Stop autosaving a font. The recovery
+        copy is left on disk.
+        """
+        if hasattr(font, "naked"):
+            font = font.naked()
+        state = self._fonts.pop(weakref.ref(font), None)
+        if state is not None:
+            state.cursor.close()
+        if not self._fonts:
+            self._stopObserving()
+
+    def hasFont(self, font):
+        """
+        Boolean if the font is being autosaved.
+        """
+        if hasattr(font, "naked"):
+            font = font.naked()
+        return weakref.ref(font) in self._fonts
+
+    def getAutosavePath(self, font):
+        """
+        Get the path of the recovery copy for a font.
+        """
+        if hasattr(font, "naked"):
+            font = font.naked()
+        return self._fonts[weakref.ref(font)].path
+
+    # --------
+    # Settings
+    # --------
+
+    def setIdleTime(self, value):
+        """
+        Set the number of seconds of user and font
+        inactivity required before autosaving.
+        The default is 5.0.
+        """
+        self._idleTime = value
+        if self._observing:
+            self._stopObserving()
+            self._startObserving()
+
+    # ----------
+    # Inactivity
+    # ----------
+
+    def _startObserving(self):
+        if self._observing:
+            return
+        self._observing = True
+        SharedActivityPoller().addObserver_(
+            dict(
+                observer=self,
+                selector="_inactivityCallback",
+                sinceUserActivity=self._idleTime,
+                sinceFontActivity=self._idleTime
+            )
+        )
+        SharedFontManager().addObserver(self, "_fontWillCloseNotificationCallback", "bstr.fontWillClose")
+
+    def _stopObserving(self):
+        if not self._observing:
+            return
+        self._observing = False
+        SharedActivityPoller().removeObserver_(
+            dict(
+                observer=self,
+                selector="_inactivityCallback"
+            )
+        )
+        SharedFontManager().removeObserver(self, "bstr.fontWillClose")
+
+    def _inactivityCallback(self, info):
+        self.autosave()
+
+    def _fontWillCloseNotificationCallback(self, notification):
+        font = notification.data["font"]
+        if self.hasFont(font):
+            self.removeFont(font)
+
+    # --------
+    # Autosave
+    # --------
+
+    def autosave(self):
+        """
+        Autosave the changes in all fonts now. The
+        snapshots are made before this returns.
+        The writing happens in the background.
+        """
+        for fontRef, state in list(self._fonts.items()):
+            font = fontRef()
+            if font is None:
+                self._fonts.pop(fontRef)
+                state.cursor.close()
+                continue
+            job = state.makeSnapshot(font)
+            if job is not None:
+                self._submitJob(job)
+        if not self._fonts:
+            self._stopObserving()
+
+    def waitUntilDone(self):
+        """
+        Block until all pending writes are done.
+        This is for scripts and benchmarks.
+        """
+        self._jobs.join()
+
+    def _submitJob(self, job):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writerLoop, name="Booster Autosave")
+            self._writer.daemon = True
+            self._writer.start()
+        self._jobs.put(job)
+
+    def _writerLoop(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                start = time.time()
+                job.write()
+                info = dict(
+                    path=job.path,
+                    complete=job.complete,
+                    glyphs=job.glyphCount,
+                    duration=time.time() - start
+                )
+                callAfter(self.postNotification, "bstr.autosaveDidFinish", info)
+            except Exception:
+                traceback.print_exc()
+                callAfter(job.state.writeDidFail)
+            finally:
+                self._jobs.task_done()
+
+
+# -----
+# State
+# -----
+
+class _AutosaveState(object):
+    """
+    The per-font bookkeeping. This is only touched
+    on the main thread. The file names are assigned
+    here so that the writer only has to write.
+    """
+
+    def __init__(self, font, path):
+        self.path = path
+        self.cursor = SharedChangeJournal().makeCursor(font=font)
+        self.needsFullSave = True
+        self.layerDirectories = {}
+        self.contents = {}
+
+    def writeDidFail(self):
+        self.needsFullSave = True
+
+    def makeSnapshot(self, font):
+        records, complete = self.cursor.getChanges()
+        if self.needsFullSave or not complete:
+            return self._makeFullSnapshot(font)
+        if not records:
+            return None
+        return self._makeIncrementalSnapshot(font, records)
+
+    def _makeFullSnapshot(self, font):
+        self.needsFullSave = False
+        self.layerDirectories = {}
+        self.contents = {}
+        job = _AutosaveJob(self, complete=True)
+        defaultLayer = font.layers.defaultLayer
+        existingDirectories = set([defaultLayerDirectory])
+        layerContents = []
+        for layer in font.layers:
+            if layer is defaultLayer:
+                directory = defaultLayerDirectory
+            else:
+                directory = userNameToFileName(layer.name, existingDirectories, prefix="glyphs.")
+                existingDirectories.add(directory.lower())
+            self.layerDirectories[layer.name] = directory
+            layerContents.append([layer.name, directory])
+            contents = self.contents[layer.name] = {}
+            existingFileNames = set()
+            for glyph in layer:
+                fileName = userNameToFileName(glyph.name, existingFileNames, suffix=".glif")
+                existingFileNames.add(fileName.lower())
+                contents[glyph.name] = fileName
+                job.addGlyph(directory, fileName, glyph)
+            job.addPlist(directory + "/contents.plist", dict(contents))
+            job.addPlist(directory + "/layerinfo.plist", _snapshotLayerInfo(layer))
+        job.addPlist("metainfo.plist", dict(creator="com.typesupply.Booster", formatVersion=3))
+        job.addPlist("layercontents.plist", layerContents)
+        for kind in fontDataKinds.values():
+            job.addFontData(kind, font)
+        job.addPlist("lib.plist", copy.deepcopy(dict(font.lib)))
+        return job
+
+    def _makeIncrementalSnapshot(self, font, records):
+        glyphs = set()
+        kinds = set()
+        for record in records:
+            kind = fontDataKinds.get(record.kind)
+            if kind is not None:
+                kinds.add(kind)
+            elif record.layer is not None:
+                glyphs.add((record.layer, record.glyph))
+        # Layers can't be added or removed incrementally.
+        for layerName, glyphName in glyphs:
+            if layerName not in self.layerDirectories or layerName not in font.layers:
+                return self._makeFullSnapshot(font)
+        job = _AutosaveJob(self, complete=False)
+        changedLayers = set()
+        existingFileNames = {}
+        for layerName, glyphName in sorted(glyphs):
+            layer = font.layers[layerName]
+            directory = self.layerDirectories[layerName]
+            contents = self.contents[layerName]
+            if glyphName in layer:
+                fileName = contents.get(glyphName)
+                if fileName is None:
+                    if layerName not in existingFileNames:
+                        existingFileNames[layerName] = set(f.lower() for f in contents.values())
+                    existing = existingFileNames[layerName]
+                    fileName = userNameToFileName(glyphName, existing, suffix=".glif")
+                    existing.add(fileName.lower())
+                    contents[glyphName] = fileName
+                    changedLayers.add(layerName)
+                job.addGlyph(directory, fileName, layer[glyphName])
+            elif glyphName in contents:
+                fileName = contents.pop(glyphName)
+                existingFileNames.get(layerName, set()).discard(fileName.lower())
+                job.removeGlyph(directory, fileName)
+                changedLayers.add(layerName)
+        for layerName in changedLayers:
+            directory = self.layerDirectories[layerName]
+            job.addPlist(directory + "/contents.plist", dict(self.contents[layerName]))
+        for kind in kinds:
+            job.addFontData(kind, font)
+        job.addPlist("lib.plist", copy.deepcopy(dict(font.lib)))
+        return job
+
+
+# ---
+# Job
+# ---
+
+class _AutosaveJob(object):
+    """
+    A snapshot that is ready to be written. Everything
+    in here has been copied from the font, so it can be
+    written on the background thread.
+    """
+
+    def __init__(self, state, complete):
+        self.state = state
+        self.path = state.path
+        self.complete = complete
+        self.files = {}
+        self.removals = []
+        self.glyphCount = 0
+
+    # Snapshot
+
+    def addGlyph(self, directory, fileName, glyph):
+        text = writeGlyphToString(glyph.name, glyph, glyph.drawPoints, formatVersion=2)
+        self.files[directory + "/" + fileName] = text.encode("utf-8")
+        self.glyphCount += 1
+
+    def removeGlyph(self, directory, fileName):
+        self.removals.append(directory + "/" + fileName)
+        self.glyphCount += 1
+
+    def addPlist(self, fileName, data):
+        self.files[fileName] = data
+
+    def addFontData(self, kind, font):
+        if kind == "info":
+            self.addPlist("fontinfo.plist", _snapshotInfo(font.info))
+        elif kind == "groups":
+            groups = dict((name, list(members)) for name, members in font.groups.items())
+            self.addPlist("groups.plist", groups)
+        elif kind == "kerning":
+            kerning = {}
+            for (first, second), value in font.kerning.items():
+                kerning.setdefault(first, {})[second] = value
+            self.addPlist("kerning.plist", kerning)
+        elif kind == "features":
+            text = font.features.text
+            if text is None:
+                text = ""
+            self.files["features.fea"] = text.encode("utf-8")
+
+    # Write
+
+    def write(self):
+        if self.complete:
+            self._writeComplete()
+        else:
+            if not os.path.exists(self.path):
+                raise IOError("The recovery copy %s no longer exists." % self.path)
+            self._writeFiles(self.path)
+            for relativePath in self.removals:
+                path = os.path.join(self.path, relativePath)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _writeComplete(self):
+        # Directories can't be replaced atomically,
+        # so swap a fully written copy into place.
+        partialPath = self.path + ".partial"
+        oldPath = self.path + ".old"
+        for path in (partialPath, oldPath):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        os.makedirs(partialPath)
+        self._writeFiles(partialPath)
+        if os.path.exists(self.path):
+            os.rename(self.path, oldPath)
+        os.rename(partialPath, self.path)
+        if os.path.exists(oldPath):
+            shutil.rmtree(oldPath)
+
+    def _writeFiles(self, root):
+        # The plists are written after the glyphs
+        # so that contents.plist never lists a
+        # glyph file that hasn't been written.
+        items = sorted(self.files.items(), key=lambda item: item[0].endswith(".plist"))
+        for relativePath, data in items:
+            path = os.path.join(root, relativePath)
+            directory = os.path.dirname(path)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            if not isinstance(data, bytes):
+                data = plistlib.dumps(data)
+            tempPath = path + ".tmp"
+            with open(tempPath, "wb") as f:
+                f.write(data)
+            os.replace(tempPath, path)
+
+
+# -------
+# Helpers
+# -------
+
+def _snapshotInfo(info):
+    data = {}
+    for attr in fontInfoAttributesVersion3:
+        value = getattr(info, attr, None)
+        if value is None:
+            continue
+        if attr == "guidelines":
+            value = [
+                dict((k, v) for k, v in guideline.items() if v is not None)
+                for guideline in value
+            ]
+        data[attr] = copy.deepcopy(value)
+    return data
+
+def _snapshotLayerInfo(layer):
+    data = {}
+    if layer.color is not None:
+        data["color"] = str(layer.color)
+    if layer.lib:
+        data["lib"] = copy.deepcopy(dict(layer.lib))
+    return data
+
+
+# ----
+# Main
+# ----
+
+_autosaver = BoosterAutosaver()
+
+def SharedAutosaver():
+    return _autosaver
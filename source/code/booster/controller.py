@@ -29,18 +29,28 @@ BoosterNotificationMixin. This posts the following notifications:
 - bstr.defaultsChanged
 """
 
+import copy
 import weakref
 from collections import OrderedDict
+from contextlib import contextmanager
+from defcon import Glyph
 from defcon.tools.notifications import Notification
 from mojo.roboFont import RFont, CurrentGlyph
 from mojo.events import addObserver as addAppObserver
 from mojo.events import removeObserver as removeAppObserver
 from mojo import extensions
-from .objects import BoosterFont
-from .activity import SharedActivityPoller
+from .objects import BoosterFont, getCachedWrapper, setCachedWrapper, getWrapper
+from .activity import SharedActivityPoller, SharedChangeJournal
 from .manager import SharedFontManager
-from .notifications import BoosterNotificationMixin
+from .glyphs import SharedGlyphObserver
+from .notifications import BoosterNotificationMixin, NotificationCoalescer, makeWeakMethod
 from .requests import SharedRequestCenter
+from .tasks import SharedTaskQueue
+from .workers import SharedWorkerPool, serializeGlyph, serializeFont
+from .eventloop import SharedEventLoop, idle, nextNotification
+
+# marks a default that is not set in the cache
+_missingDefault = object()
 
 
 class BoosterController(BoosterNotificationMixin):
@@ -55,7 +65,14 @@ class BoosterController(BoosterNotificationMixin):
         """
         Subclasses should not implement this. Implement start instead.
         """
-        self._fontObservervations = {}
+        self._fontObservations = {}
+        self._wrappedFonts = None
+        self._wrappedFontsGeneration = None
+        self._defaultsCache = {}
+        self._defaultColorsCache = {}
+        self._defaultsTransactionDepth = 0
+        self._defaultsChanges = OrderedDict()
+        self._defaultsWrites = OrderedDict()
 
     def start(self):
         """
@@ -93,14 +110,20 @@ class BoosterController(BoosterNotificationMixin):
     Convenience for SharedRequestCenter.
     """
 
-    def addResponder(self, responder, selector, request):
-        SharedRequestCenter().addResponder(responder, selector, request)
+    def addResponder(self, responder, selector, request, threadSafe=False):
+        SharedRequestCenter().addResponder(responder, selector, request, threadSafe=threadSafe)
 
-    def removeResponder(self, request):
-        SharedRequestCenter().removeResponder(request)
+    def removeResponder(self, request, responder=None):
+        SharedRequestCenter().removeResponder(request, responder=responder)
 
     def postRequest(self, request, *args, **kwargs):
-        SharedRequestCenter().removeResponder(request, *args, **kwargs)
+        return SharedRequestCenter().postRequest(request, *args, **kwargs)
+
+    def postRequestAsync(self, request, args=(), kwargs=None, timeout=None, callback=None):
+        return SharedRequestCenter().postRequestAsync(request, args=args, kwargs=kwargs, timeout=timeout, callback=callback)
+
+    def gatherRequest(self, request, args=(), kwargs=None, timeout=None, callback=None):
+        return SharedRequestCenter().gatherRequest(request, args=args, kwargs=kwargs, timeout=timeout, callback=callback)
 
     # --------
     # Defaults
@@ -110,11 +133,33 @@ class BoosterController(BoosterNotificationMixin):
     Defaults will be handled by mojo.extensions default functions.
     They will be stored with the provided key appended to the
     string defined in self.identifier.
+
+    The values are cached in memory after they are first read
+    and they are written through to the defaults when they are
+    set, so reading a default is as fast as a dict lookup.
+    Missing defaults are cached too. Lists, dicts and sets are
+    copied when they are cached and when they are returned, so
+    changing a returned value doesn't change the cache. If
+    defaults are changed directly with mojo.extensions, call
+    reloadDefaults to clear the cache.
+
+    Changes made within defaultsTransaction are written to the
+    defaults when the transaction ends and they are posted in
+    one bstr.defaultsChanged notification:
+
+        with controller.defaultsTransaction():
+            controller.setDefault("color", color)
+            controller.setDefault("width", 10)
     """
 
     def _makeDefaultKey(self, key):
         return self.identifier + "." + key
 
+    def _copyDefault(self, value):
+        if isinstance(value, (list, dict, set)):
+            value = copy.deepcopy(value)
+        return value
+
     def registerDefaults(self, defaults):
         """
         Convenience for mojo.extensions.registerExtensionDefaults.
@@ -124,38 +169,101 @@ class BoosterController(BoosterNotificationMixin):
             k = self._makeDefaultKey(k)
             d[k] = v
         extensions.registerExtensionDefaults(d)
+        for k in defaults.keys():
+            self._defaultsCache.pop(k, None)
+            self._defaultColorsCache.pop(k, None)
+
+    def reloadDefaults(self):
+        """
+        Clear the cached defaults. They will be
+        read again the next time they are requested.
+        """
+        self._defaultsCache.clear()
+        self._defaultColorsCache.clear()
 
     def getDefault(self, key, fallback=None):
         """
         Convenience for mojo.extensions.getExtensionDefault.
         """
-        key = self._makeDefaultKey(key)
-        return extensions.getExtensionDefault(key, fallback=fallback)
+        value = self._defaultsCache.get(key, _missingDefault)
+        if value is _missingDefault:
+            value = self._defaultsCache[key] = extensions.getExtensionDefault(self._makeDefaultKey(key))
+        if value is None:
+            return fallback
+        return self._copyDefault(value)
 
-    def getDefaultColor(self, fallback=None):
+    def getDefaultColor(self, key, fallback=None):
         """
         Convenience for mojo.extensions.getExtensionDefaultColor.
         """
-        key = self._makeDefaultKey(key)
-        return extensions.getExtensionDefaultColor(key, fallback=fallback)
+        value = self._defaultColorsCache.get(key, _missingDefault)
+        if value is _missingDefault:
+            value = self._defaultColorsCache[key] = extensions.getExtensionDefaultColor(self._makeDefaultKey(key))
+        if value is None:
+            return fallback
+        return value
 
     def setDefault(self, key, value):
         """
         Convenience for mojo.extensions.setExtensionDefault.
         """
-        fullKey = self._makeDefaultKey(key)
-        old = extensions.getExtensionDefault(fullKey)
-        extensions.setExtensionDefault(fullKey, value)
-        self.postNotification("bstr.defaultsChanged", {key : (old, value)})
+        old = self.getDefault(key)
+        self._defaultsCache[key] = self._copyDefault(value)
+        self._defaultColorsCache.pop(key, None)
+        self._writeDefault(extensions.setExtensionDefault, key, value)
+        self._defaultDidChange(key, old, value)
 
     def setDefaultColor(self, key, value):
         """
         Convenience for mojo.extensions.setExtensionDefaultColor.
         """
-        fullKey = self._makeDefaultKey(key)
-        old = extensions.getExtensionDefaultColor(fullKey)
-        extensions.setExtensionDefaultColor(fullKey, value)
-        self.postNotification("bstr.defaultsChanged", {key : (old, value)})
+        old = self.getDefaultColor(key)
+        self._defaultColorsCache[key] = value
+        self._defaultsCache.pop(key, None)
+        self._writeDefault(extensions.setExtensionDefaultColor, key, value)
+        self._defaultDidChange(key, old, value)
+
+    def _writeDefault(self, writer, key, value):
+        if not self._defaultsTransactionDepth:
+            writer(self._makeDefaultKey(key), value)
+            return
+        # The last write for a key wins.
+        self._defaultsWrites.pop(key, None)
+        self._defaultsWrites[key] = (writer, self._copyDefault(value))
+
+    def _defaultDidChange(self, key, old, value):
+        if not self._defaultsTransactionDepth:
+            self.postNotification("bstr.defaultsChanged", {key : (old, value)})
+            return
+        if key in self._defaultsChanges:
+            old = self._defaultsChanges[key][0]
+        self._defaultsChanges[key] = (old, value)
+
+    @contextmanager
+    def defaultsTransaction(self):
+        """
+        Write all defaults set within the context at once
+        and post one bstr.defaultsChanged notification for
+        them. The notification data contains {key : (old, new)}
+        for each changed key. Transactions may be nested. The
+        defaults are written and the notification is posted
+        when the outermost transaction ends. The cached values
+        are updated immediately.
+        """
+        self._defaultsTransactionDepth += 1
+        try:
+            yield
+        finally:
+            self._defaultsTransactionDepth -= 1
+            if not self._defaultsTransactionDepth:
+                writes = list(self._defaultsWrites.items())
+                self._defaultsWrites.clear()
+                for key, (writer, value) in writes:
+                    writer(self._makeDefaultKey(key), value)
+            if not self._defaultsTransactionDepth and self._defaultsChanges:
+                changes = dict(self._defaultsChanges)
+                self._defaultsChanges.clear()
+                self.postNotification("bstr.defaultsChanged", changes)
 
     # ---
     # App
@@ -191,8 +299,10 @@ class BoosterController(BoosterNotificationMixin):
 
     def _fontManagerAvailableFontsChangedNotificationCallback(self, notification):
         name = notification.name
-        self.getAllFonts()
-        self.postNotification(name, dict(fonts=self.getAllFonts()))
+        self.postNotification(name, self._makeAvailableFontsData)
+
+    def _makeAvailableFontsData(self):
+        return dict(fonts=self.getAllFonts())
 
     # --------
     # Activity
@@ -207,15 +317,21 @@ class BoosterController(BoosterNotificationMixin):
             appIsActive=None,
             sinceUserActivity=2.0,
             sinceFontActivity=2.0,
-            repeat=False
+            repeat=False,
+            font=None
         ):
+        """
+        If font is given, only changes to that font
+        count as font activity for this observer.
+        """
         info = dict(
             observer=observer,
             selector=selector,
             appIsActive=appIsActive,
             sinceUserActivity=sinceUserActivity,
             sinceFontActivity=sinceFontActivity,
-            repeat=repeat
+            repeat=repeat,
+            font=self._unwrapFont(font)
         )
         SharedActivityPoller().addObserver_(info)
 
@@ -226,6 +342,86 @@ class BoosterController(BoosterNotificationMixin):
         )
         SharedActivityPoller().removeObserver_(info)
 
+    # ----------
+    # Coroutines
+    # ----------
+
+    """
+    Convenience for SharedEventLoop.
+    """
+
+    def runTask(self, coroutine):
+        """
+        Run a coroutine on the Cocoa run loop.
+        This returns an asyncio.Task.
+        """
+        return SharedEventLoop().runTask(coroutine)
+
+    def idle(self, sinceUserActivity=2.0, sinceFontActivity=2.0, appIsActive=None, font=None):
+        """
+        Wait for inactivity. This returns an awaitable that
+        results in the info dict given to activity observers.
+        """
+        return idle(
+            sinceUserActivity=sinceUserActivity,
+            sinceFontActivity=sinceFontActivity,
+            appIsActive=appIsActive,
+            font=font
+        )
+
+    def nextNotification(self, notification, observable=None):
+        """
+        Wait for a notification posted by observable.
+        If observable is None, this controller is used.
+        """
+        if observable is None:
+            observable = self
+        return nextNotification(notification, observable=observable)
+
+    # -----
+    # Tasks
+    # -----
+
+    """
+    Convenience for SharedTaskQueue.
+    """
+
+    def addIdleTask(self, generator, priority=0, name=None, callback=None):
+        return SharedTaskQueue().addTask(generator, priority=priority, name=name, callback=callback)
+
+    def removeIdleTask(self, task):
+        SharedTaskQueue().removeTask(task)
+
+    # -------
+    # Workers
+    # -------
+
+    """
+    Convenience for SharedWorkerPool.
+    """
+
+    def submit(self, func, objects, args=(), name=None):
+        """
+        Run func in the worker processes for each of the given
+        fonts and glyphs. objects may be a font, a glyph or a
+        list of fonts and glyphs. func is called with a FontData
+        or GlyphData copy of each object, followed by *args.
+
+        This returns a BoosterWorkJob. Observe it to get the
+        results. Call its cancel method to cancel it.
+        """
+        if hasattr(objects, "naked") or hasattr(objects, "dispatcher"):
+            objects = [objects]
+        items = []
+        for obj in objects:
+            if hasattr(obj, "naked"):
+                obj = obj.naked()
+            if hasattr(obj, "layers"):
+                items.append(serializeFont(obj))
+            else:
+                items.append(serializeGlyph(obj))
+        return SharedWorkerPool().submit(func, items, args=args, name=name)
+
     # -----
     # Fonts
     # -----
@@ -244,10 +440,19 @@ class BoosterController(BoosterNotificationMixin):
             return native
         if not hasattr(native, "naked"):
             naked = native
+            wrapped = getCachedWrapper(naked, self.fontWrapperClass)
+            if wrapped is not None:
+                return wrapped
             native = RFont(naked)
         else:
             naked = native.naked()
+            wrapped = getCachedWrapper(naked, self.fontWrapperClass)
+            # the interface may have been shown or
+            # hidden since the wrapper was cached.
+            if wrapped is not None and wrapped.hasInterface() == native.hasInterface():
+                return wrapped
         wrapped = self.fontWrapperClass(naked, showInterface=native.hasInterface(), document=native.document())
+        setCachedWrapper(naked, wrapped)
         return wrapped
 
     def getWrappedFont(self, font):
@@ -257,17 +462,29 @@ class BoosterController(BoosterNotificationMixin):
         """
         return self._rewrapFont(font)
 
+    def getFontsGeneration(self):
+        """
+        Get the generation number of the available fonts
+        from the SharedFontManager. This changes when
+        the available fonts change.
+        """
+        return SharedFontManager().getGeneration()
+
     def getAllFonts(self):
         """
         Get all fonts from the SharedFontManager wrapped with
         the font class defined as self.fontWrapperClass.
         """
-        fonts = SharedFontManager().getAllFonts()
-        fonts = [self._rewrapFont(native) for native in fonts]
-        for font in fonts:
-            if font.uniqueName is None:
-                font.makeUniqueName(fonts)
-        return fonts
+        manager = SharedFontManager()
+        generation = manager.getGeneration()
+        if self._wrappedFontsGeneration != generation:
+            fonts = [self._rewrapFont(native) for native in manager.getFontsSnapshot()]
+            for font in fonts:
+                if font.uniqueName is None:
+                    font.makeUniqueName()
+            self._wrappedFonts = tuple(fonts)
+            self._wrappedFontsGeneration = generation
+        return list(self._wrappedFonts)
 
     def getCurrentFont(self):
         """
@@ -287,17 +504,42 @@ class BoosterController(BoosterNotificationMixin):
         glyph = CurrentGlyph()
         if glyph is None:
             return None
-        layer = glyph.layer
-        layerName = layer.name
+        glyph = glyph.naked()
         font = self._rewrapFont(glyph.font)
-        layer = font.getLayer(layerName)
+        layer = font.getLayer(glyph.layer.name)
         glyph = layer[glyph.name]
         return glyph
 
+    def getFontsWithGlyph(self, name):
+        """
+        Get the fonts that contain a glyph named name wrapped
+        with the font class defined as self.fontWrapperClass.
+        """
+        fonts = SharedFontManager().getFontsWithGlyph(name)
+        return [self._rewrapFont(font) for font in fonts]
+
+    def getMissingGlyphNames(self, fonts=None):
+        """
+        Get a list of (font, names) tuples. names is the set of
+        glyph names that are in at least one of the fonts but
+        are not in font. If fonts is None, all fonts will be
+        compared. The fonts are wrapped with the font class
+        defined as self.fontWrapperClass.
+        """
+        missing = SharedFontManager().getMissingGlyphNames(fonts)
+        return [(self._rewrapFont(font), names) for font, names in missing]
+
     def openFont(self, path, showInterface=True):
         """
         Open a font wrapped with the font class defined as self.fontWrapperClass.
+
+        If the font pool in the SharedFontManager is on, fonts
+        without an interface are opened through the pool.
         """
+        manager = SharedFontManager()
+        if not showInterface and manager.isFontPoolEnabled():
+            opener = lambda: self.fontWrapperClass(path, showInterface=False)
+            return self._rewrapFont(manager.getPooledFont(path, opener))
         font = self.fontWrapperClass(path, showInterface=showInterface)
         return font
 
@@ -310,67 +552,251 @@ class BoosterController(BoosterNotificationMixin):
 
     # observation
 
+    """
+    The font observations are kept in a flat table keyed by
+    (id of the naked font, notification). Each entry maps the
+    id of an observer to a _FontObservation holding the
+    already resolved method. Entries remove themselves when
+    the font or the observer is deallocated.
+    """
+
     def _fontNotificationCallback(self, notification):
-        notificationName = notification.name
         nakedFont = notification.object
-        notificationData = notification.data
-        nakedFontRef = weakref.ref(nakedFont)
+        entries = self._fontObservations.get((id(nakedFont), notification.name))
+        if not entries:
+            return
         wrappedFont = self._rewrapFont(nakedFont)
-        wrappedFontRef = weakref.ref(wrappedFont)
         notification = Notification(
-            name=notificationName,
-            objRef=wrappedFontRef,
-            data=notificationData
+            name=notification.name,
+            objRef=weakref.ref(wrappedFont),
+            data=notification.data
         )
-        if nakedFontRef in self._fontObservervations:
-            if notificationName in self._fontObservervations[nakedFontRef]:
-                for observerRef, selector in self._fontObservervations[nakedFontRef][notificationName].items():
-                    observer = observerRef()
-                    if observer is not None:
-                        meth = getattr(observer, selector)
-                        meth(notification)
+        for observation in list(entries.values()):
+            observation.dispatch(notification)
+
+    def _makeCoalescedNotificationCallback(self, observerRef, selector, fontRef, cursor):
+        def callback(notifications):
+            observer = observerRef()
+            naked = fontRef()
+            if observer is None or naked is None:
+                return
+            # The wrappers in the queued notifications
+            # may be gone, so the font is wrapped again.
+            font = self._rewrapFont(naked)
+            first = notifications[0]
+            records, complete = cursor.getChanges()
+            objects = self._getChangedObjects(font, records)
+            objects.add(font)
+            data = dict(
+                objects=objects,
+                complete=complete,
+                notifications=len(notifications),
+                data=[n.data for n in notifications if n.data is not None]
+            )
+            notification = Notification(
+                name=first.name,
+                objRef=weakref.ref(font),
+                data=data
+            )
+            meth = getattr(observer, selector)
+            meth(notification)
+        return callback
+
+    def _getChangedObjects(self, font, records):
+        # Find the layers and glyphs named in the
+        # journal records that still exist in font.
+        objects = set()
+        layers = {}
+        layerOrder = None
+        for record in records:
+            if record.layer is None:
+                continue
+            layer = layers.get(record.layer)
+            if layer is None:
+                if layerOrder is None:
+                    layerOrder = font.layerOrder
+                if record.layer not in layerOrder:
+                    continue
+                layer = layers[record.layer] = font.getLayer(record.layer)
+                objects.add(layer)
+            if record.glyph in layer:
+                objects.add(layer[record.glyph])
+        return objects
+
+    def _removeFontObservation(self, key, observerKey):
+        entries = self._fontObservations.get(key)
+        if entries is None:
+            return
+        observation = entries.pop(observerKey, None)
+        if observation is None:
+            return
+        observation.invalidate()
+        if not entries:
+            del self._fontObservations[key]
+            naked = observation.fontRef()
+            if naked is not None and naked.hasObserver(self, key[1]):
+                naked.removeObserver(self, key[1])
 
     def hasFontObserver(self, font, observer, notification):
         """
         Boolean if the font is being observed.
         """
         nakedFont = self._unwrapFont(font)
-        nakedFontRef = weakref.ref(nakedFont)
-        observerRef = weakref.ref(observer)
-        if nakedFontRef in self._fontObservervations:
-            if notification in self._fontObservervations[nakedFontRef]:
-                if notification in self._fontObservervations[nakedFontRef]:
-                    if observerRef in self._fontObservervations[nakedFontRef][notification]:
-                        return True
-        return False
-
-    def addFontObserver(self, font, observer, selector, notification):
+        entries = self._fontObservations.get((id(nakedFont), notification))
+        if entries is None:
+            return False
+        return id(observer) in entries
+
+    def addFontObserver(self, font, observer, selector, notification,
+            throttle=None,
+            debounce=None,
+            leading=None,
+            trailing=True
+        ):
         """
         Observe a font. The method called for the notification
         will recieve a font object wrapped with self.fontWrapperClass.
+
+        Give throttle or debounce, in seconds, to have the
+        notifications that arrive close together merged into
+        one call. See NotificationCoalescer for the details
+        and for leading and trailing. The merged notification
+        has the name of the first notification, the font
+        as its object and data with this structure:
+
+            {
+                  objects : The set of the font and the layers
+                            and glyphs that changed.
+                 complete : False if changes were dropped from
+                            the change journal. objects may be
+                            missing layers and glyphs.
+            notifications : The number of merged notifications.
+                     data : A list of the notification data.
+            }
+
+        The changed layers and glyphs are read from the
+        SharedChangeJournal and they are wrapped with
+        self.fontWrapperClass.
         """
         naked = self._unwrapFont(font)
+        key = (id(naked), notification)
+        observerKey = id(observer)
+        entries = self._fontObservations.get(key)
+        if entries is None:
+            entries = self._fontObservations[key] = OrderedDict()
+        assert observerKey not in entries, "Observer %r is already registered for %r." % (observer, notification)
         if not naked.hasObserver(self, notification):
-            font.addObserver(self, "_fontNotificationCallback", notification)
-        fontRef = weakref.ref(naked)
-        observerRef = weakref.ref(observer)
-        if fontRef not in self._fontObservervations:
-            self._fontObservervations[fontRef] = {}
-        if notification not in self._fontObservervations[fontRef]:
-            self._fontObservervations[fontRef][notification] = OrderedDict()
-        assert observerRef not in self._fontObservervations[fontRef][notification], "Observer %r is already registered for %r." % (observer, notification)
-        self._fontObservervations[fontRef][notification][observerRef] = selector
+            naked.addObserver(self, "_fontNotificationCallback", notification)
+        coalescer = cursor = None
+        if throttle is not None or debounce is not None:
+            cursor = SharedChangeJournal().makeCursor(naked)
+            coalescer = NotificationCoalescer(
+                self._makeCoalescedNotificationCallback(weakref.ref(observer), selector, weakref.ref(naked), cursor),
+                throttle=throttle,
+                debounce=debounce,
+                leading=leading,
+                trailing=trailing
+            )
+        observation = _FontObservation(naked, observer, selector, coalescer, cursor)
+        observation.finalizers = [
+            weakref.finalize(naked, self._removeFontObservation, key, observerKey),
+            weakref.finalize(observer, self._removeFontObservation, key, observerKey)
+        ]
+        entries[observerKey] = observation
 
     def removeFontObserver(self, font, observer, notification):
         """
         Stop observing a font.
         """
         naked = self._unwrapFont(font)
-        fontRef = weakref.ref(naked)
-        observerRef = weakref.ref(observer)
-        del self._fontObservervations[fontRef][notification][observerRef]
-        if not self._fontObservervations[fontRef][notification]:
-            del self._fontObservervations[fontRef][notification]
-            naked.removeObserver(self, notification)
-        if not self._fontObservervations[fontRef]:
-            del self._fontObservervations[fontRef]
+        self._removeFontObservation((id(naked), notification), id(observer))
+
+    # -----------------
+    # Glyph Observation
+    # -----------------
+
+    """
+    Convenience for SharedGlyphObserver. The glyphs given
+    to the observers are wrapped with the glyph class
+    defined in self.fontWrapperClass.
+    """
+
+    def _unwrapGlyph(self, glyph):
+        if hasattr(glyph, "naked"):
+            glyph = glyph.naked()
+        return glyph
+
+    def _unwrapGlyphs(self, glyphs):
+        # glyphs may be a glyph or anything that iterates
+        # over glyphs: a list, a layer or a font.
+        glyphs = self._unwrapGlyph(glyphs)
+        if isinstance(glyphs, Glyph):
+            return [glyphs]
+        return [self._unwrapGlyph(glyph) for glyph in glyphs]
+
+    def _rewrapGlyph(self, naked):
+        glyphClass = self.fontWrapperClass.layerClass.glyphClass
+        if naked.font is None:
+            return getWrapper(naked, glyphClass)
+        # The layer caches the glyph wrapper.
+        font = self._rewrapFont(naked.font)
+        layer = font.getLayer(naked.layer.name)
+        return layer[naked.name]
+
+    def hasGlyphObserver(self, glyph, observer, notification="Glyph.Changed"):
+        """
+        Boolean if the glyph is being observed.
+        """
+        glyph = self._unwrapGlyph(glyph)
+        return SharedGlyphObserver().hasObserver(glyph, observer, notification, wrap=self._rewrapGlyph)
+
+    def addGlyphObserver(self, glyphs, observer, selector, notification="Glyph.Changed"):
+        """
+        Observe a glyph or a list of glyphs. A layer or a font
+        may be given to observe all of the glyphs in the layer
+        or in the font's default layer. The method called
+        for the notification will recieve a glyph object wrapped
+        with the glyph class in self.fontWrapperClass.
+
+        Observing a list of glyphs is much faster than
+        observing the glyphs one by one.
+        """
+        glyphs = self._unwrapGlyphs(glyphs)
+        SharedGlyphObserver().addObserver(glyphs, observer, selector, notification, wrap=self._rewrapGlyph)
+
+    def removeGlyphObserver(self, glyphs, observer, notification="Glyph.Changed"):
+        """
+        Stop observing a glyph, a list of glyphs, a layer
+        or a font.
+        """
+        glyphs = self._unwrapGlyphs(glyphs)
+        SharedGlyphObserver().removeObserver(glyphs, observer, notification, wrap=self._rewrapGlyph)
+
+
+class _FontObservation(object):
+
+    __slots__ = ("fontRef", "method", "coalescer", "cursor", "finalizers")
+
+    def __init__(self, font, observer, selector, coalescer, cursor):
+        self.fontRef = weakref.ref(font)
+        self.coalescer = coalescer
+        self.cursor = cursor
+        self.finalizers = []
+        self.method = makeWeakMethod(observer, selector)
+
+    def dispatch(self, notification):
+        if self.coalescer is not None:
+            self.coalescer.post(notification)
+            return
+        method = self.method()
+        if method is not None:
+            method(notification)
+
+    def invalidate(self):
+        for finalizer in self.finalizers:
+            finalizer.detach()
+        self.finalizers = []
+        if self.coalescer is not None:
+            self.coalescer.cancel()
+        if self.cursor is not None:
+            self.cursor.close()
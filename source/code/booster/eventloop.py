@@ -0,0 +1,256 @@
+"""
+---------------
+SharedEventLoop
+---------------
+
+This function returns the asyncio event loop shared by all
+Booster based extensions. The loop is run in small steps from
+a timer on the Cocoa run loop when it has something to do,
+so coroutines interleave with editing instead of blocking it:
+
+    async def checkAfterEditing(controller):
+        info = await controller.idle(sinceUserActivity=2)
+        notification = await controller.nextNotification("bstr.fontDidOpen")
+        result = await SharedRequestCenter().request("Sandwich.Make", cheese=True)
+
+    SharedEventLoop().runTask(checkAfterEditing(controller))
+
+The awaitables are:
+
+- idle: waits for inactivity. See SharedActivityPoller.
+- nextNotification: waits for a notification.
+- BoosterRequestCenter.request: posts a request.
+
+The coroutines run on the main thread, so they may work
+with fonts and the interface. They should not do long
+blocking work between awaits. Use SharedWorkerPool for that.
+
+When there is no Cocoa run loop, as in scripts that run
+without the interface, use runUntilComplete. It runs the
+loop until the coroutine is done. Notifications and
+requests work in this mode. The activity poller needs the
+Cocoa run loop, so idle does not.
+"""
+
+import asyncio
+from Foundation import NSTimer
+from PyObjCTools.AppHelper import callAfter
+from .activity import SharedActivityPoller
+from .notifications import SharedNotificationCenter
+
+# ----
+# Loop
+# ----
+
+"""
+The loop is only stepped when it has something to do. After
+each step a one-shot timer is scheduled for the loop's next
+scheduled callback. While the tasks are only waiting for
+futures, no timer is scheduled. Resolving a future schedules
+its callbacks on the loop and that schedules a step.
+"""
+
+class _SteppedEventLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self, wake):
+        super(_SteppedEventLoop, self).__init__()
+        self._bstr_wake = wake
+
+    def call_soon(self, callback, *args, **kwargs):
+        handle = super(_SteppedEventLoop, self).call_soon(callback, *args, **kwargs)
+        if not self.is_running():
+            self._bstr_wake()
+        return handle
+
+    def call_at(self, when, callback, *args, **kwargs):
+        handle = super(_SteppedEventLoop, self).call_at(when, callback, *args, **kwargs)
+        if not self.is_running():
+            self._bstr_wake()
+        return handle
+
+    def call_soon_threadsafe(self, callback, *args, **kwargs):
+        handle = super(_SteppedEventLoop, self).call_soon_threadsafe(callback, *args, **kwargs)
+        callAfter(self._bstr_wake)
+        return handle
+
+    def getNextStepTime(self):
+        """
+        Get the loop time at which the loop has something
+        to do. Returns None if it is only waiting.
+        """
+        if self._ready:
+            return self.time()
+        # cancelled handles may still be in the heap.
+        times = [handle.when() for handle in self._scheduled if not handle.cancelled()]
+        if not times:
+            return None
+        return min(times)
+
+
+class BoosterEventLoop(object):
+
+    def __init__(self):
+        self._loop = None
+        self._timer = None
+        self._timerTime = None
+        self._stepping = False
+
+    def getLoop(self):
+        """
+        Get the asyncio event loop.
+        """
+        if self._loop is None:
+            self._loop = _SteppedEventLoop(self._scheduleStep)
+        return self._loop
+
+    def runTask(self, coroutine):
+        """
+        Run a coroutine on the Cocoa run loop.
+        This returns an asyncio.Task.
+        """
+        loop = self.getLoop()
+        task = loop.create_task(coroutine)
+        self._scheduleStep()
+        return task
+
+    def runUntilComplete(self, coroutine):
+        """
+        Run a coroutine until it is done and return its
+        result. This is for use when there is no Cocoa
+        run loop. It blocks until the coroutine is done.
+        """
+        self._stopStepping()
+        loop = self.getLoop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            self._scheduleStep()
+
+    def createFuture(self):
+        """
+        Create a future attached to the loop. The future may
+        be resolved from any callback on the main thread.
+        """
+        return self.getLoop().create_future()
+
+    # --------
+    # Stepping
+    # --------
+
+    def _scheduleStep(self):
+        loop = self._loop
+        if loop is None or self._stepping or loop.is_running():
+            return
+        when = loop.getNextStepTime()
+        if when is None:
+            self._stopStepping()
+            return
+        if self._timer is not None:
+            if self._timerTime <= when:
+                return
+            self._stopStepping()
+        self._timerTime = when
+        self._timer = NSTimer.scheduledTimerWithTimeInterval_repeats_block_(
+            max(0, when - loop.time()),
+            False,
+            self._timerCallback
+        )
+
+    def _stopStepping(self):
+        if self._timer is not None:
+            self._timer.invalidate()
+            self._timer = None
+            self._timerTime = None
+
+    def _timerCallback(self, timer):
+        self._timer = None
+        self._timerTime = None
+        self._step()
+        self._scheduleStep()
+
+    def _step(self):
+        # Run the callbacks that are ready and
+        # return without waiting for more.
+        loop = self._loop
+        if loop.is_running():
+            return
+        self._stepping = True
+        try:
+            loop.call_soon(loop.stop)
+        finally:
+            self._stepping = False
+        loop.run_forever()
+
+
+# ----------
+# Awaitables
+# ----------
+
+class _FutureObserver(object):
+
+    def __init__(self, future, remove):
+        self.future = future
+        self.remove = remove
+        future.add_done_callback(self._futureIsDone)
+
+    def callback(self, value):
+        if not self.future.done():
+            self.future.set_result(value)
+
+    def _futureIsDone(self, future):
+        # This removes the observation after
+        # the result or after cancellation.
+        remove = self.remove
+        self.remove = None
+        if remove is not None:
+            remove(self)
+
+
+def idle(sinceUserActivity=2.0, sinceFontActivity=2.0, appIsActive=None, font=None):
+    """
+    Wait for inactivity. This returns an awaitable that
+    results in the info dict given to activity observers.
+    See SharedActivityPoller for the arguments.
+    """
+    future = SharedEventLoop().createFuture()
+    poller = SharedActivityPoller()
+    def remove(observer):
+        poller.removeObserver_(dict(observer=observer, selector="callback"))
+    observer = _FutureObserver(future, remove)
+    poller.addObserver_(
+        dict(
+            observer=observer,
+            selector="callback",
+            appIsActive=appIsActive,
+            sinceUserActivity=sinceUserActivity,
+            sinceFontActivity=sinceFontActivity,
+            font=font,
+            repeat=False
+        )
+    )
+    return future
+
+def nextNotification(notification, observable=None):
+    """
+    Wait for a notification posted through the shared
+    notification center. If observable is None, the
+    notification may be posted by any object. This
+    returns an awaitable that results in the notification.
+    """
+    future = SharedEventLoop().createFuture()
+    dispatcher = SharedNotificationCenter()
+    def remove(observer):
+        dispatcher.removeObserver(observer, notification, observable)
+    observer = _FutureObserver(future, remove)
+    dispatcher.addObserver(observer, "callback", notification=notification, observable=observable)
+    return future
+
+
+# ----
+# Main
+# ----
+
+_eventLoop = BoosterEventLoop()
+
+def SharedEventLoop():
+    return _eventLoop
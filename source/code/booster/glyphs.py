@@ -0,0 +1,222 @@
+"""
+-------------------
+SharedGlyphObserver
+-------------------
+
+This function returns the glyph observer shared by all
+Booster based extensions. The observer keeps one defcon
+subscription per glyph and notification, no matter how
+many extensions and observers are interested in it, and
+fans each notification out to the registered observers.
+
+    def glyphChanged(self, notification):
+        glyph = notification.object
+
+    SharedGlyphObserver().addObserver(glyphs, self, "glyphChanged", "Glyph.Changed")
+
+glyphs is a list of defcon glyphs. The list may be long,
+so subscribing to every glyph in a font is one call.
+
+A wrap callable may be given when adding an observer.
+It will be called with the defcon glyph and the value it
+returns will be the object of the notification given to
+the observer. The glyph is wrapped once per wrap callable
+for each notification. BoosterController uses this to give
+observers glyphs wrapped in the extension's classes.
+
+Observations are removed automatically when the observer
+or the glyph is deallocated.
+"""
+
+import weakref
+from collections import OrderedDict
+from defcon.tools.notifications import Notification
+from .notifications import makeWeakMethod
+
+
+class BoosterGlyphObserver(object):
+
+    def __init__(self):
+        # (glyph id, notification) : _GlyphSubscription
+        self._subscriptions = OrderedDict()
+        # (observer id, notification, wrap) : _GlyphObservation
+        self._observations = {}
+
+    # ------------
+    # Subscription
+    # ------------
+
+    def _subscribe(self, glyph, notification):
+        key = (id(glyph), notification)
+        subscription = self._subscriptions.get(key)
+        if subscription is None:
+            subscription = _GlyphSubscription(glyph, notification, self._makeGlyphReleaser(key))
+            self._subscriptions[key] = subscription
+            glyph.addObserver(self, "_glyphNotificationCallback", notification)
+        return key, subscription
+
+    def _unsubscribe(self, key, observationKey):
+        subscription = self._subscriptions.get(key)
+        if subscription is None:
+            return
+        subscription.observations.pop(observationKey, None)
+        if subscription.observations:
+            return
+        del self._subscriptions[key]
+        glyph = subscription.glyphRef()
+        if glyph is not None and glyph.hasObserver(self, key[1]):
+            glyph.removeObserver(self, key[1])
+
+    def _makeGlyphReleaser(self, key):
+        def releaser(ref):
+            # the glyph was deallocated.
+            subscription = self._subscriptions.get(key)
+            if subscription is None or subscription.glyphRef is not ref:
+                return
+            del self._subscriptions[key]
+            for observationKey in subscription.observations.keys():
+                observation = self._observations.get(observationKey)
+                if observation is None:
+                    continue
+                observation.keys.discard(key)
+                if not observation.keys:
+                    self._dropObservation(observationKey)
+        return releaser
+
+    def _dropObservation(self, observationKey):
+        observation = self._observations.pop(observationKey, None)
+        if observation is None:
+            return None
+        observation.finalizer.detach()
+        return observation
+
+    def _observerDied(self, observationKey):
+        observation = self._observations.pop(observationKey, None)
+        if observation is None:
+            return
+        for key in observation.keys:
+            self._unsubscribe(key, observationKey)
+
+    # ---------
+    # Observers
+    # ---------
+
+    def hasObserver(self, glyph, observer, notification, wrap=None):
+        """
+        Boolean if observer is observing notification in glyph.
+        """
+        observation = self._observations.get((id(observer), notification, wrap))
+        if observation is None:
+            return False
+        return (id(glyph), notification) in observation.keys
+
+    def addObserver(self, glyphs, observer, selector, notification, wrap=None):
+        """
+        Add an observer for notification in all of the given glyphs.
+
+        glyphs: a list of defcon glyphs.
+        observer: the object that will be notified.
+        selector: the name of the method to call.
+        notification: the defcon notification name.
+        wrap: a callable that will wrap the glyph. Optional.
+
+        If observer is already observing notification with
+        wrap in other glyphs, selector replaces the method
+        that was given for those glyphs.
+        """
+        observationKey = (id(observer), notification, wrap)
+        observation = self._observations.get(observationKey)
+        if observation is None:
+            observation = _GlyphObservation(observer, selector, wrap)
+            observation.finalizer = weakref.finalize(observer, self._observerDied, observationKey)
+            self._observations[observationKey] = observation
+        elif observation.selector != selector:
+            observation.selector = selector
+            observation.method = makeWeakMethod(observer, selector)
+        for glyph in glyphs:
+            key, subscription = self._subscribe(glyph, notification)
+            subscription.observations[observationKey] = observation
+            observation.keys.add(key)
+
+    def removeObserver(self, glyphs, observer, notification, wrap=None):
+        """
+        Remove an observer for notification in all of the given glyphs.
+        Glyphs that are not being observed are ignored.
+        """
+        observationKey = (id(observer), notification, wrap)
+        observation = self._observations.get(observationKey)
+        if observation is None:
+            return
+        for glyph in glyphs:
+            key = (id(glyph), notification)
+            if key not in observation.keys:
+                continue
+            observation.keys.remove(key)
+            self._unsubscribe(key, observationKey)
+        if not observation.keys:
+            self._dropObservation(observationKey)
+
+    def getSubscriptionCount(self):
+        """
+        Get the number of defcon subscriptions.
+        """
+        return len(self._subscriptions)
+
+    # --------
+    # Dispatch
+    # --------
+
+    def _glyphNotificationCallback(self, notification):
+        nakedGlyph = notification.object
+        subscription = self._subscriptions.get((id(nakedGlyph), notification.name))
+        if subscription is None:
+            return
+        wrapped = {}
+        for observation in list(subscription.observations.values()):
+            method = observation.method()
+            if method is None:
+                continue
+            wrap = observation.wrap
+            if wrap is None:
+                method(notification)
+                continue
+            wrappedNotification = wrapped.get(wrap)
+            if wrappedNotification is None:
+                glyph = wrap(nakedGlyph)
+                wrappedNotification = wrapped[wrap] = Notification(
+                    name=notification.name,
+                    objRef=weakref.ref(glyph),
+                    data=notification.data
+                )
+            method(wrappedNotification)
+
+
+class _GlyphSubscription(object):
+
+    __slots__ = ("glyphRef", "observations")
+
+    def __init__(self, glyph, notification, releaser):
+        self.glyphRef = weakref.ref(glyph, releaser)
+        self.observations = OrderedDict()
+
+
+class _GlyphObservation(object):
+
+    __slots__ = ("selector", "method", "wrap", "keys", "finalizer")
+
+    def __init__(self, observer, selector, wrap):
+        self.selector = selector
+        self.method = makeWeakMethod(observer, selector)
+        self.wrap = wrap
+        self.keys = set()
+        self.finalizer = None
+
+
+# ----
+# Main
+# ----
+
+_glyphObserver = BoosterGlyphObserver()
+
+def SharedGlyphObserver():
+    return _glyphObserver
@@ -16,8 +16,35 @@ The manager allows subscribing to the following notifications:
 - bstr.fontDidOpen
 - bstr.fontWillClose
 - bstr.fontDidClose
+
+bstr.availableFontsChanged is coalesced. It is posted once at
+the next turn of the run loop, no matter how many fonts were
+opened or closed.
+
+The list of available fonts is cached. The cache is rebuilt
+after a font is opened, closed or changes visibility and the
+generation number is incremented each time. Compare the
+number from getGeneration with one stored earlier to find
+out if the available fonts have changed.
+
+Fonts without an interface can optionally be kept in a pool
+with a limited size. See setFontPoolLimits below.
+
+The manager keeps an index of the glyph names in the default
+layers of the available fonts and the fonts without an
+interface. The index is updated as glyphs are added, removed
+and renamed. See getFontsWithGlyph and getMissingGlyphNames.
+
+The manager also keeps the registry of unique font names.
+Names are assigned when fonts are opened, released when
+fonts are closed and reassigned when the family or style
+name of a font changes.
 """
 
+import os
+import time
+import weakref
+from collections import OrderedDict
 from mojo.events import addObserver as addAppObserver
 from mojo.events import removeObserver as removeAppObserver
 from .notifications import BoosterNotificationMixin
@@ -26,22 +53,53 @@ from .notifications import BoosterNotificationMixin
 class BoosterFontManager(BoosterNotificationMixin):
 
     def __init__(self):
-        self._noInterface = set()
+        # id(naked font) : (font, normalized path)
+        self._noInterface = {}
+        # normalized path : id(naked font)
+        self._noInterfacePaths = {}
         self._fontChangingVisibility = None
+        self._fontsSnapshot = None
+        self._generation = 0
+        # normalized path : [font, last access time]
+        self._fontPool = OrderedDict()
+        # id(naked font) : normalized path
+        self._fontPoolPaths = {}
+        self._fontPoolEnabled = False
+        self._fontPoolMaxFonts = None
+        self._fontPoolMaxGlyphs = None
+        # glyph name : set of id(naked font)
+        self._glyphNameIndex = {}
+        # id(naked font) : (font, naked font, naked default layer)
+        self._indexedFonts = {}
+        self._glyphNameIndexGeneration = None
+        self._fontNames = weakref.WeakKeyDictionary()
+        self._namedFonts = {}
+        self._nameParts = {}
+        self._nameIncrements = {}
         addAppObserver(self, "_fontDidOpenNotificationCallback", "fontDidOpen")
         addAppObserver(self, "_newFontDidOpenNotificationCallback", "newFontDidOpen")
         addAppObserver(self, "_fontWillCloseNotificationCallback", "fontWillClose")
         addAppObserver(self, "_fontDidCloseNotificationCallback", "fontDidClose")
 
+    def _addToNoInterface(self, font):
+        self._removeFromNoInterface(font)
+        key = id(font.naked())
+        path = _normalizePath(font.path)
+        self._noInterface[key] = (font, path)
+        if path is not None:
+            self._noInterfacePaths[path] = key
+
     def _removeFromNoInterface(self, font):
-        naked = font.naked()
-        for other in self._noInterface:
-            if other.naked() == naked:
-                self._noInterface.remove(other)
-                break
-            if font.path is not None and other.path == font.path:
-                self._noInterface.remove(other)
-                break
+        key = id(font.naked())
+        if key not in self._noInterface:
+            # a different object for the same file
+            path = _normalizePath(font.path)
+            key = self._noInterfacePaths.get(path)
+            if key is None:
+                return
+        other, path = self._noInterface.pop(key)
+        if path is not None and self._noInterfacePaths.get(path) == key:
+            del self._noInterfacePaths[path]
 
     def fontWillChangeVisibility(self, font):
         """
@@ -53,39 +111,46 @@ class BoosterFontManager(BoosterNotificationMixin):
         So, this makes a note to not pay attention
         to the incoming notifications.
         """
-        self._fontChangingVisibility = font
+        self._fontChangingVisibility = font.naked()
 
     def fontDidChangeVisibility(self, font):
         """
         Notification relay. Don't use this externally.
         """
-        if font in self._noInterface:
-            self._noInterface.remove(font)
+        if id(font.naked()) in self._noInterface:
+            self._removeFromNoInterface(font)
         else:
-            self._noInterface.add(font)
+            self._addToNoInterface(font)
         self._fontChangingVisibility = None
+        self._availableFontsDidChange()
 
     def fontDidOpen(self, font):
         """
         Notification relay. Don't use this externally.
         """
-        if self._fontChangingVisibility == font:
+        if self._fontChangingVisibility is font.naked():
             return
         if not font.hasInterface():
-            self._noInterface.add(font)
+            self._addToNoInterface(font)
         else:
             self._removeFromNoInterface(font)
+        self._availableFontsDidChange()
+        self.makeUniqueName(font)
         self.postNotification("bstr.fontDidOpen", data=dict(font=font))
-        self.postNotification("bstr.availableFontsChanged", data=dict(fonts=self.getAllFonts()))
+        self._postAvailableFontsChanged()
 
     def fontWillClose(self, font):
         """
         Notification relay. Don't use this externally.
         """
-        if self._fontChangingVisibility == font:
+        if self._fontChangingVisibility is font.naked():
             return
         if not font.hasInterface():
             self._removeFromNoInterface(font)
+        self._removeFromFontPool(font)
+        self._removeFromGlyphNameIndex(font)
+        self._releaseUniqueName(font.naked())
+        self._availableFontsDidChange()
         self.postNotification("bstr.fontWillClose", data=dict(font=font))
 
     def fontDidClose(self):
@@ -94,17 +159,50 @@ class BoosterFontManager(BoosterNotificationMixin):
         """
         if self._fontChangingVisibility is not None:
             return
+        self._availableFontsDidChange()
         self.postNotification("bstr.fontDidClose")
-        self.postNotification("bstr.availableFontsChanged", data=dict(fonts=self.getAllFonts()))
+        self._postAvailableFontsChanged()
+
+    # ---------------
+    # Available Fonts
+    # ---------------
+
+    def _postAvailableFontsChanged(self):
+        # Opening or closing many fonts at once
+        # only posts one of these.
+        # The data is built when the queue is posted.
+        self.postNotificationCoalesced("bstr.availableFontsChanged", data=self._makeAvailableFontsData)
+
+    def _makeAvailableFontsData(self):
+        return dict(fonts=self.getAllFonts(), generation=self._generation)
+
+    def _availableFontsDidChange(self):
+        self._fontsSnapshot = None
+        self._generation += 1
+
+    def getGeneration(self):
+        """
+        Get the generation number of the available fonts.
+        """
+        return self._generation
+
+    def getFontsSnapshot(self):
+        """
+        Get a tuple of all fonts. The same tuple is
+        returned until the available fonts change.
+        """
+        if self._fontsSnapshot is None:
+            from mojo.roboFont import AllFonts #, FontList
+            fonts = AllFonts()# + [font for font, path in self._noInterface.values()]
+            # fonts = FontList(fonts)
+            self._fontsSnapshot = tuple(fonts)
+        return self._fontsSnapshot
 
     def getAllFonts(self):
         """
         Get all fonts.
         """
-        from mojo.roboFont import AllFonts #, FontList
-        fonts = AllFonts()# + list(self._noInterface)
-        # fonts = FontList(fonts)
-        return fonts
+        return list(self.getFontsSnapshot())
 
     def getCurrentFont(self):
         """
@@ -113,6 +211,300 @@ class BoosterFontManager(BoosterNotificationMixin):
         from mojo.roboFont import CurrentFont
         return CurrentFont()
 
+    # ---------
+    # Font Pool
+    # ---------
+
+    def setFontPoolLimits(self, maxFonts=None, maxGlyphs=None):
+        """
+        Turn on the font pool. Fonts without an interface that
+        are opened with getPooledFont (BoosterController.openFont
+        does this) are kept in the pool. When the pool is larger
+        than the limits, the least recently used fonts that have
+        no unsaved changes are closed. A closed font is opened
+        again the next time it is requested by path.
+
+        maxFonts: the maximum number of fonts.
+        maxGlyphs: the maximum number of glyphs in all
+                   layers of the fonts. This approximates
+                   the memory used by the fonts.
+
+        Either limit may be None. Don't hold on to pooled fonts.
+        Request them by path each time they are needed.
+        """
+        self._fontPoolEnabled = True
+        self._fontPoolMaxFonts = maxFonts
+        self._fontPoolMaxGlyphs = maxGlyphs
+        self._trimFontPool()
+
+    def disableFontPool(self):
+        """
+        Turn off the font pool. The pooled fonts are
+        not closed. They are no longer tracked.
+        """
+        self._fontPoolEnabled = False
+        self._fontPool.clear()
+        self._fontPoolPaths.clear()
+
+    def isFontPoolEnabled(self):
+        """
+        Boolean indicating if the font pool is on.
+        """
+        return self._fontPoolEnabled
+
+    def getPooledFont(self, path, opener):
+        """
+        Get the pooled font for path. If it is not in
+        the pool, opener will be called to open it.
+        """
+        key = _normalizePath(path)
+        entry = self._fontPool.get(key)
+        if entry is not None:
+            entry[1] = time.time()
+            self._fontPool.move_to_end(key)
+            return entry[0]
+        font = opener()
+        if not self._fontPoolEnabled or font.hasInterface():
+            return font
+        self._fontPool[key] = [font, time.time()]
+        self._fontPoolPaths[id(font.naked())] = key
+        self._trimFontPool(keep=key)
+        return font
+
+    def getFontPoolInfo(self):
+        """
+        Get a dict with this structure:
+
+            {
+                        fonts : The number of pooled fonts.
+                       glyphs : The number of glyphs in the pooled fonts.
+                     maxFonts : The font limit.
+                    maxGlyphs : The glyph limit.
+            }
+        """
+        return dict(
+            fonts=len(self._fontPool),
+            glyphs=sum(_countGlyphs(font) for font, accessed in self._fontPool.values()),
+            maxFonts=self._fontPoolMaxFonts,
+            maxGlyphs=self._fontPoolMaxGlyphs
+        )
+
+    def _removeFromFontPool(self, font):
+        key = self._fontPoolPaths.pop(id(font.naked()), None)
+        if key is not None:
+            self._fontPool.pop(key, None)
+
+    def _trimFontPool(self, keep=None):
+        maxFonts = self._fontPoolMaxFonts
+        maxGlyphs = self._fontPoolMaxGlyphs
+        fontCount = len(self._fontPool)
+        glyphCounts = {}
+        if maxGlyphs is not None:
+            for key, (font, accessed) in self._fontPool.items():
+                glyphCounts[key] = _countGlyphs(font)
+        glyphCount = sum(glyphCounts.values())
+        # least recently used first
+        for key, (font, accessed) in list(self._fontPool.items()):
+            overFonts = maxFonts is not None and fontCount > maxFonts
+            overGlyphs = maxGlyphs is not None and glyphCount > maxGlyphs
+            if not overFonts and not overGlyphs:
+                break
+            if key == keep or font.naked().dirty:
+                continue
+            # take the font out of the pool before closing it.
+            # the font may not tell the font manager that
+            # it is closing.
+            del self._fontPool[key]
+            self._fontPoolPaths.pop(id(font.naked()), None)
+            fontCount -= 1
+            glyphCount -= glyphCounts.get(key, 0)
+            font.close()
+
+    # ----------------
+    # Glyph Name Index
+    # ----------------
+
+    def getFontsWithGlyph(self, name):
+        """
+        Get a list of the fonts that contain a glyph named name.
+        """
+        self._updateGlyphNameIndex()
+        keys = self._glyphNameIndex.get(name)
+        if not keys:
+            return []
+        return [self._indexedFonts[key][0] for key in keys]
+
+    def getMissingGlyphNames(self, fonts=None):
+        """
+        Get a list of (font, names) tuples. names is the set of
+        glyph names that are in at least one of the fonts but
+        are not in font. If fonts is None, all indexed fonts
+        will be compared.
+        """
+        self._updateGlyphNameIndex()
+        if fonts is None:
+            keys = list(self._indexedFonts.keys())
+        else:
+            keys = []
+            for font in fonts:
+                if hasattr(font, "naked"):
+                    font = font.naked()
+                key = id(font)
+                if key in self._indexedFonts:
+                    keys.append(key)
+        keySet = set(keys)
+        missing = dict((key, set()) for key in keys)
+        for name, fontKeys in self._glyphNameIndex.items():
+            present = fontKeys & keySet
+            if present and len(present) != len(keySet):
+                for key in keySet - present:
+                    missing[key].add(name)
+        return [(self._indexedFonts[key][0], missing[key]) for key in keys]
+
+    def _updateGlyphNameIndex(self):
+        if self._glyphNameIndexGeneration == self._generation:
+            return
+        self._glyphNameIndexGeneration = self._generation
+        fonts = {}
+        for font in self.getFontsSnapshot():
+            fonts[id(font.naked())] = font
+        for font, path in self._noInterface.values():
+            fonts[id(font.naked())] = font
+        for key in list(self._indexedFonts.keys()):
+            if key not in fonts:
+                self._unindexFont(key)
+        for key, font in fonts.items():
+            if key not in self._indexedFonts:
+                self._indexFont(key, font)
+
+    def _indexFont(self, key, font):
+        naked = font.naked()
+        layer = naked.layers.defaultLayer
+        self._indexedFonts[key] = (font, naked, layer)
+        for name in layer.keys():
+            self._glyphNameIndex.setdefault(name, set()).add(key)
+        layer.addObserver(self, "_layerGlyphAddedNotificationCallback", "Layer.GlyphAdded")
+        layer.addObserver(self, "_layerGlyphDeletedNotificationCallback", "Layer.GlyphDeleted")
+        layer.addObserver(self, "_layerGlyphNameChangedNotificationCallback", "Layer.GlyphNameChanged")
+        naked.layers.addObserver(self, "_defaultLayerChangedNotificationCallback", "LayerSet.DefaultLayerChanged")
+
+    def _unindexFont(self, key):
+        font, naked, layer = self._indexedFonts.pop(key)
+        for name in layer.keys():
+            self._removeNameFromGlyphNameIndex(name, key)
+        layer.removeObserver(self, "Layer.GlyphAdded")
+        layer.removeObserver(self, "Layer.GlyphDeleted")
+        layer.removeObserver(self, "Layer.GlyphNameChanged")
+        naked.layers.removeObserver(self, "LayerSet.DefaultLayerChanged")
+
+    def _removeFromGlyphNameIndex(self, font):
+        # the font is closing.
+        key = id(font.naked())
+        if key in self._indexedFonts:
+            self._unindexFont(key)
+
+    def _removeNameFromGlyphNameIndex(self, name, key):
+        keys = self._glyphNameIndex.get(name)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._glyphNameIndex[name]
+
+    def _layerGlyphAddedNotificationCallback(self, notification):
+        key = id(notification.object.font)
+        self._glyphNameIndex.setdefault(notification.data["name"], set()).add(key)
+
+    def _layerGlyphDeletedNotificationCallback(self, notification):
+        key = id(notification.object.font)
+        self._removeNameFromGlyphNameIndex(notification.data["name"], key)
+
+    def _layerGlyphNameChangedNotificationCallback(self, notification):
+        key = id(notification.object.font)
+        self._removeNameFromGlyphNameIndex(notification.data["oldValue"], key)
+        self._glyphNameIndex.setdefault(notification.data["newValue"], set()).add(key)
+
+    def _defaultLayerChangedNotificationCallback(self, notification):
+        naked = notification.object.font
+        key = id(naked)
+        font = self._indexedFonts[key][0]
+        self._unindexFont(key)
+        self._indexFont(key, font)
+
+    # ------------
+    # Unique Names
+    # ------------
+
+    def getUniqueName(self, font):
+        """
+        Get the unique name of a font. This will
+        be None if no name has been assigned.
+        """
+        if hasattr(font, "naked"):
+            font = font.naked()
+        return self._fontNames.get(font)
+
+    def makeUniqueName(self, font):
+        """
+        Get the unique name of a font, assigning
+        one if no name has been assigned.
+        """
+        if hasattr(font, "naked"):
+            font = font.naked()
+        name = self._fontNames.get(font)
+        if name is not None:
+            return name
+        base = _makeBaseName(font.info)
+        name = self._claimName(base)
+        self._fontNames[font] = name
+        self._namedFonts[name] = weakref.ref(font, self._makeNameReleaser(name))
+        font.info.addObserver(self, "_fontInfoChangedNotificationCallback", "Info.ValueChanged")
+        return name
+
+    def _claimName(self, base):
+        if base not in self._namedFonts:
+            self._nameParts[base] = (base, None)
+            return base
+        # Start at the lowest increment that may be free.
+        increment = self._nameIncrements.get(base, 1)
+        while 1:
+            name = base + " " + repr(increment)
+            if name not in self._namedFonts:
+                break
+            increment += 1
+        self._nameIncrements[base] = increment + 1
+        self._nameParts[name] = (base, increment)
+        return name
+
+    def _releaseName(self, name):
+        del self._namedFonts[name]
+        base, increment = self._nameParts.pop(name)
+        if increment is not None and increment < self._nameIncrements.get(base, 1):
+            self._nameIncrements[base] = increment
+
+    def _makeNameReleaser(self, name):
+        def releaser(ref):
+            # the font was deallocated without being closed.
+            if self._namedFonts.get(name) is ref:
+                self._releaseName(name)
+        return releaser
+
+    def _releaseUniqueName(self, font):
+        name = self._fontNames.pop(font, None)
+        if name is None:
+            return
+        self._releaseName(name)
+        font.info.removeObserver(self, "Info.ValueChanged")
+
+    def _fontInfoChangedNotificationCallback(self, notification):
+        if notification.data["attribute"] not in ("familyName", "styleName"):
+            return
+        font = notification.object.font
+        if font is None:
+            return
+        self._releaseUniqueName(font)
+        self.makeUniqueName(font)
+
     # -------------
     # Notifications
     # -------------
@@ -132,6 +524,29 @@ class BoosterFontManager(BoosterNotificationMixin):
     def _fontDidCloseNotificationCallback(self, info):
         self.fontDidClose()
 
+def _countGlyphs(font):
+    count = 0
+    for layer in font.naked().layers:
+        count += len(layer)
+    return count
+
+def _normalizePath(path):
+    if path is None:
+        return None
+    return os.path.normcase(os.path.abspath(path))
+
+def _makeBaseName(info):
+    family = info.familyName
+    style = info.styleName
+    if family is None:
+        family = "Untitled Family"
+    if style is None:
+        style = "Untitled Style"
+    name = "-".join((family, style))
+    if name == "Untitled Family-Untitled Style":
+        name = "Untitled Font"
+    return name
+
 # ----
 # Main
 # ----
@@ -5,9 +5,72 @@ SharedNotificationCenter
 
 This provides notification support to various objects.
 Refer to defcon.tools.notifications for documentation.
+
+The shared notification center skips posting entirely when
+nobody observes the notification. The data may be a callable.
+It is called once, only if the notification has observers,
+and its return value is given to the observers:
+
+    self.postNotification("bstr.fontsChanged", data=self.makeFontsData)
+
+NotificationCoalescer merges bursts of notifications
+into single calls. See below for details.
+
+BoosterNotificationMixin.postNotificationCoalesced queues
+a notification instead of posting it. Notifications queued
+for the same object and name are merged into one and the
+queue is posted at the next turn of the run loop. When there
+is no run loop, as in scripts that run without the interface,
+call flushCoalescedNotifications to post the queue.
+
+postNotificationOnMainThread may be called from any thread.
+On the main thread it posts the notification immediately.
+On other threads it adds the notification to a queue that
+is posted on the main thread in batches. The notifications
+are posted in the order in which they were queued. At most
+the time given to setMaxDrainTime is spent posting queued
+notifications per turn of the run loop. callOnMainThread
+uses the same queue for any callable. When there is no run
+loop, call drainMainThreadQueue to process the queue.
 """
 
+import time
+import weakref
+import threading
+import traceback
+from collections import OrderedDict, deque
+from Foundation import NSTimer
 from defcon.tools.notifications import NotificationCenter
+from PyObjCTools.AppHelper import callAfter
+
+class BoosterNotificationCenter(NotificationCenter):
+
+    """
+    A defcon NotificationCenter that returns before any
+    work is done when a notification has no observers.
+    """
+
+    def hasObservers(self, observable, notification):
+        """
+        Returns a boolean indicating if any observer would
+        be given notification posted by observable.
+        """
+        registry = self._registry
+        observableRef = weakref.ref(observable)
+        return (
+            (notification, observableRef) in registry
+            or (notification, None) in registry
+            or (None, observableRef) in registry
+            or (None, None) in registry
+        )
+
+    def postNotification(self, notification, observable, data=None):
+        if not self._holds and not self.hasObservers(observable, notification):
+            return
+        if callable(data):
+            data = data()
+        super(BoosterNotificationCenter, self).postNotification(notification, observable, data=data)
+
 
 class BoosterNotificationMixin(object):
 
@@ -32,12 +95,311 @@ class BoosterNotificationMixin(object):
     	dispatcher = SharedNotificationCenter()
     	dispatcher.postNotification(notification=notification, observable=self, data=data)
 
+    def hasObservers(self, notification):
+        """
+        Boolean indicating if notification posted by
+        this object has any observers.
+        """
+        dispatcher = SharedNotificationCenter()
+        return dispatcher.hasObservers(self, notification)
+
+    def postNotificationOnMainThread(self, notification, data=None):
+        """
+        Post a notification on the main thread. This may
+        be called from any thread. If it is called from
+        the main thread, the notification is posted
+        immediately. Otherwise it is queued.
+        """
+        _mainThreadQueue.call(self.postNotification, notification, data)
+
+    def postNotificationCoalesced(self, notification, data=None, merge=None):
+        """
+        Queue a notification to be posted at the next turn of
+        the run loop. If a notification with the same name is
+        already queued for this object, the data is merged into
+        the queued data. merge is a callable that will be given
+        the queued data and the new data and that returns the
+        merged data. By default, dicts are updated with the
+        new dict and other data is replaced by the new data.
+
+        data may be a callable. It is only called when the
+        queue is posted and the notification has observers.
+        Use this when the data is expensive to build.
+        """
+        _notificationQueue.post(self, notification, data, merge)
+
+
+def flushCoalescedNotifications():
+    """
+    Post the notifications queued with postNotificationCoalesced.
+    """
+    _notificationQueue.flush()
+
+
+def _mergeNotificationData(queued, data):
+    if isinstance(queued, dict) and isinstance(data, dict):
+        merged = dict(queued)
+        merged.update(data)
+        return merged
+    return data
+
+
+class _NotificationQueue(object):
+
+    def __init__(self):
+        # (id(observable), notification) : [observable, notification, data]
+        self._queue = OrderedDict()
+        self._timer = None
+
+    def post(self, observable, notification, data, merge):
+        key = (id(observable), notification)
+        entry = self._queue.get(key)
+        if entry is None:
+            self._queue[key] = [observable, notification, data]
+        else:
+            if merge is None:
+                merge = _mergeNotificationData
+            entry[2] = merge(entry[2], data)
+        if self._timer is None:
+            self._timer = NSTimer.scheduledTimerWithTimeInterval_repeats_block_(
+                0,
+                False,
+                self._timerCallback
+            )
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.invalidate()
+            self._timer = None
+        # Observers may queue more notifications.
+        while self._queue:
+            queue = self._queue
+            self._queue = OrderedDict()
+            for observable, notification, data in queue.values():
+                observable.postNotification(notification, data)
+
+    def _timerCallback(self, timer):
+        self._timer = None
+        self.flush()
+
+
+# ----------
+# Coalescing
+# ----------
+
+class NotificationCoalescer(object):
+    """
+    Merge notifications that arrive close together into
+    a single call of callback. callback is called with a
+    list of the merged notifications.
+
+    throttle: Seconds. callback is called at most once
+              during this window.
+    debounce: Seconds. callback is called once the
+              notifications have stopped arriving for
+              this long.
+    leading: Boolean indicating if callback should be called
+             for the first notification in a window or burst.
+             The default is True for throttle and False
+             for debounce.
+    trailing: Boolean indicating if callback should be called
+              with the notifications that arrived after the
+              leading call at the end of the window or burst.
+              The default is True.
+
+    Only one of throttle and debounce may be given.
+    """
+
+    def __init__(self, callback, throttle=None, debounce=None, leading=None, trailing=True):
+        assert (throttle is None) != (debounce is None), "Exactly one of throttle and debounce must be given."
+        if leading is None:
+            leading = throttle is not None
+        self._callback = callback
+        self._throttle = throttle
+        self._debounce = debounce
+        self._leading = leading
+        self._trailing = trailing
+        self._pending = []
+        self._timer = None
+        self._deadline = None
+
+    def post(self, notification):
+        if self._timer is None:
+            # start of a window or burst
+            if self._leading:
+                self._callback([notification])
+            else:
+                self._pending.append(notification)
+            if self._throttle is not None:
+                self._startTimer(self._throttle)
+            else:
+                self._startTimer(self._debounce)
+            return
+        self._pending.append(notification)
+        if self._debounce is not None:
+            # The timer isn't restarted for every
+            # notification. It checks the deadline
+            # when it fires instead.
+            self._deadline = time.time() + self._debounce
+
+    def flush(self):
+        """
+        Deliver the pending notifications now.
+        """
+        self._stopTimer()
+        self._deliverPending()
+
+    def cancel(self):
+        """
+        Drop the pending notifications.
+        """
+        self._stopTimer()
+        self._pending = []
+
+    def _deliverPending(self):
+        pending = self._pending
+        self._pending = []
+        if pending and self._trailing:
+            self._callback(pending)
+            return True
+        return False
+
+    def _startTimer(self, interval):
+        self._deadline = time.time() + interval
+        self._timer = NSTimer.scheduledTimerWithTimeInterval_repeats_block_(
+            interval,
+            False,
+            self._timerCallback
+        )
+
+    def _stopTimer(self):
+        if self._timer is not None:
+            self._timer.invalidate()
+            self._timer = None
+
+    def _timerCallback(self, timer):
+        self._timer = None
+        remaining = self._deadline - time.time()
+        if remaining > 0:
+            self._startTimer(remaining)
+            return
+        delivered = self._deliverPending()
+        # Keep the rate bounded after a trailing call.
+        if delivered and self._throttle is not None:
+            self._startTimer(self._throttle)
+
+
+# -----------
+# Main Thread
+# -----------
+
+def getDefaultMaxDrainTime():
+    return 0.01
+
+def callOnMainThread(func, *args):
+    """
+    Call func with args on the main thread. This may
+    be called from any thread. If it is called from
+    the main thread, func is called immediately.
+    """
+    _mainThreadQueue.call(func, *args)
+
+def setMaxDrainTime(value):
+    """
+    Set the maximum number of seconds spent processing
+    the main thread queue per turn of the run loop.
+    The rest of the queue is processed in the next
+    turn. None means no limit. The default is 0.01.
+    """
+    _mainThreadQueue.maxDrainTime = value
+
+def drainMainThreadQueue():
+    """
+    Process everything in the main thread queue.
+    This must be called on the main thread.
+    """
+    _mainThreadQueue.drain(None)
+
+
+class _MainThreadQueue(object):
+
+    def __init__(self):
+        # deque.append and deque.popleft are atomic,
+        # so the queue itself needs no lock.
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._drainScheduled = False
+        self.maxDrainTime = getDefaultMaxDrainTime()
+
+    def call(self, func, *args):
+        if threading.current_thread() is threading.main_thread():
+            func(*args)
+            return
+        self._items.append((func, args))
+        self._scheduleDrain()
+
+    def _scheduleDrain(self):
+        with self._lock:
+            if self._drainScheduled:
+                return
+            self._drainScheduled = True
+        callAfter(self._drainCallback)
+
+    def _drainCallback(self):
+        # Reset before draining so that items queued
+        # during the drain schedule another one.
+        with self._lock:
+            self._drainScheduled = False
+        self.drain(self.maxDrainTime)
+        if self._items:
+            self._scheduleDrain()
+
+    def drain(self, maxTime):
+        end = None
+        if maxTime is not None:
+            end = time.time() + maxTime
+        items = self._items
+        while items:
+            func, args = items.popleft()
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+            if end is not None and time.time() >= end:
+                break
+
+
+# ------------
+# Weak Methods
+# ------------
+
+def makeWeakMethod(observer, selector):
+    """
+    Make a callable that returns the observer's selector
+    method or None if the observer has been deallocated.
+    The observer is not retained.
+    """
+    method = getattr(observer, selector)
+    try:
+        return weakref.WeakMethod(method)
+    except TypeError:
+        # not a plain Python method
+        observerRef = weakref.ref(observer)
+        def resolve():
+            observer = observerRef()
+            if observer is None:
+                return None
+            return getattr(observer, selector)
+        return resolve
+
 
 # ----
 # Main
 # ----
 
-_dispatcher = NotificationCenter()
+_dispatcher = BoosterNotificationCenter()
+_notificationQueue = _NotificationQueue()
+_mainThreadQueue = _MainThreadQueue()
 
 def SharedNotificationCenter():
     return _dispatcher
\ No newline at end of file
@@ -36,6 +36,19 @@ low-level defcon objects, so if your object wrapper is lost,
 you can still get it by rewrapping the lower-level object.
 
 
+Wrapper Identity
+----------------
+
+Wrappers are cached on the low-level defcon objects. There
+is one font wrapper per wrapper class for each defcon font.
+Layers and glyphs are bound to the font or layer wrapper that
+they were asked for through, so they are cached per wrapper
+class and per parent wrapper. Asking the same font for the
+same layer or glyph repeatedly gives you the same wrapper
+object. The cache does not keep the wrappers alive. A wrapper
+is cached for as long as something else references it.
+
+
 Automatic Font Manager Interaction
 ----------------------------------
 
@@ -43,7 +56,9 @@ The font class will alert the font manager when a font is
 opened/closed regardless of whether it has an interface or not.
 It is extremely important that you close fonts without interfaces
 once you are done using them. The font manager will retain a reference
-to them and they will stay in memory until you close them.
+to them and they will stay in memory until you close them. Turning on
+the font pool in the font manager will close the least recently
+used fonts without unsaved changes automatically.
 
 
 See below for additional things.
@@ -74,6 +89,68 @@ class TempDataMixin(object):
 class TempData(object): pass
 
 
+# -------------
+# Wrapper Cache
+# -------------
+
+def _makeWrapperKey(wrapperClass, parent):
+    if parent is None:
+        return wrapperClass
+    # A cached child references its parent, so the
+    # id can't be reused while the entry exists.
+    return (wrapperClass, id(parent))
+
+def getCachedWrapper(naked, wrapperClass, parent=None):
+    """
+    Get the cached wrapperClass wrapper for a
+    defcon object. If parent is given, only a
+    wrapper bound to that parent wrapper will
+    be returned. Returns None if there is none.
+    """
+    wrappers = getattr(naked, "_bstr_wrappers", None)
+    if wrappers is None:
+        return None
+    return wrappers.get(_makeWrapperKey(wrapperClass, parent))
+
+def setCachedWrapper(naked, wrapper, parent=None):
+    """
+    Cache a wrapper for a defcon object. If parent
+    is given, the wrapper is cached for that parent
+    wrapper only. The wrapper is not retained.
+    """
+    wrappers = getattr(naked, "_bstr_wrappers", None)
+    if wrappers is None:
+        wrappers = naked._bstr_wrappers = weakref.WeakValueDictionary()
+    wrappers[_makeWrapperKey(wrapper.__class__, parent)] = wrapper
+
+def getWrapper(naked, wrapperClass):
+    """
+    Get the wrapperClass wrapper for a defcon object,
+    creating and caching it if needed. This is for
+    objects that are wrapped with wrapperClass(naked).
+    """
+    wrapper = getCachedWrapper(naked, wrapperClass)
+    if wrapper is None:
+        wrapper = wrapperClass(naked)
+        setCachedWrapper(naked, wrapper)
+    return wrapper
+
+def getChildWrapper(naked, wrapperClass, parent, attribute):
+    """
+    Get the wrapperClass wrapper for a defcon object
+    that belongs to the parent wrapper, creating and
+    caching it if needed. A new wrapper is bound to
+    parent with the given attribute, for example
+    "font" for layers or "layer" for glyphs.
+    """
+    wrapper = getCachedWrapper(naked, wrapperClass, parent)
+    if wrapper is None:
+        wrapper = wrapperClass(naked)
+        setattr(wrapper, attribute, parent)
+        setCachedWrapper(naked, wrapper, parent)
+    return wrapper
+
+
 # -------------
 # Notifications
 # -------------
@@ -137,6 +214,10 @@ class BoosterLayer(RLayer, TempDataMixin, BoosterDefconNotificationMixin):
     libClass = BoosterLib
     glyphClass = BoosterGlyph
 
+    def _getItem(self, name, **kwargs):
+        glyph = self.naked()[name]
+        return getChildWrapper(glyph, self.glyphClass, self, "layer")
+
 
 class BoosterFont(RFont, TempDataMixin, BoosterDefconNotificationMixin):
 
@@ -148,12 +229,21 @@ class BoosterFont(RFont, TempDataMixin, BoosterDefconNotificationMixin):
     layerClass = BoosterLayer
     guidelineClass = BoosterGuideline
 
+    def _getLayer(self, name, **kwargs):
+        layer = self.naked().layers[name]
+        return getChildWrapper(layer, self.layerClass, self, "font")
+
     # ------------------------
     # Font Manager Interaction
     # ------------------------
 
     def _init(self, pathOrObject=None, showInterface=True, **kwargs):
         super(BoosterFont, self)._init(pathOrObject, showInterface, **kwargs)
+        # fonts created directly are cached so that
+        # rewrapping the font gives this object.
+        naked = self.naked()
+        if getCachedWrapper(naked, self.__class__) is None:
+            setCachedWrapper(naked, self)
         # don't announce ths as a new font if
         # the font manager has already seen it.
         announce = False
@@ -184,47 +274,20 @@ class BoosterFont(RFont, TempDataMixin, BoosterDefconNotificationMixin):
         )
 
     def _get_uniqueName(self):
-        if not hasattr(self.bstr_tempData, "bstr_uniqueName"):
-            self.bstr_tempData.bstr_uniqueName = None
-        return self.bstr_tempData.bstr_uniqueName
+        manager = SharedFontManager()
+        return manager.getUniqueName(self)
 
-    def makeUniqueName(self, others):
+    def makeUniqueName(self, others=None):
         """
         Make a unique name for and assign it to this font.
-        `others` should be all open fonts. This name is suitable
-        for use as informative text in interface controls (such
-        as font selection controls) but should not be used for
-        storage, reference or anything else that requires
-        reproducability.
+        This name is suitable for use as informative text
+        in interface controls (such as font selection controls)
+        but should not be used for storage, reference or
+        anything else that requires reproducability.
+
+        The names are kept by the font manager, so `others`
+        is no longer needed. It is only accepted for
+        backwards compatibility.
         """
-        existing = set()
-        for font in others:
-            if font == self:
-                continue
-            if font.uniqueName is not None:
-                existing.add(font.uniqueName)
-        family = self.info.familyName
-        style = self.info.styleName
-        if family is None:
-            family = "Untitled Family"
-        if style is None:
-            style = "Untitled Style"
-        name = "-".join((family, style))
-        if name == "Untitled Family-Untitled Style":
-            name = "Untitled Font"
-        increment = None
-        while 1:
-            if increment is None:
-                if name not in existing:
-                    break
-                else:
-                    increment = 1
-            else:
-                n = name + " " + repr(increment)
-                if n not in existing:
-                    name = n
-                    break
-                else:
-                    increment += 1
-        self.bstr_tempData.bstr_uniqueName = name
-        return name
+        manager = SharedFontManager()
+        return manager.makeUniqueName(self)
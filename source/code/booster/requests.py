@@ -34,37 +34,152 @@ Here's an example responder:
 To send a request, you do this:
 
     sandwich = SharedRequestCenter().postRequest("Sandwich.Make", cheese=True, meat=False)
+
+Background threads can use postRequestOnMainThread. The request
+is posted on the main thread and the response is given to the
+returned future:
+
+    future = SharedRequestCenter().postRequestOnMainThread("Sandwich.Make", cheese=True, meat=False)
+    sandwich = future.result()
+
+postRequestAsync never runs the responder on the caller's stack.
+It returns a concurrent.futures.Future right away. Responders
+run on the main thread by default. A responder that is safe to
+run on a background thread can say so when it is added, and it
+will run in a thread pool shared by all requests:
+
+    SharedRequestCenter().addResponder(myCafe, "makeSalad", "Salad.Make", threadSafe=True)
+
+    def saladIsReady(future):
+        salad = future.result()
+
+    SharedRequestCenter().postRequestAsync(
+        "Salad.Make",
+        kwargs=dict(dressing="vinaigrette"),
+        timeout=5,
+        callback=saladIsReady
+    )
+
+If the response doesn't arrive within the timeout, the future
+gets a concurrent.futures.TimeoutError. A request that has not
+started can be cancelled with the future's cancel method. The
+callback is called on the main thread when the future is done.
+
+More than one responder may be registered for a request.
+postRequest and postRequestAsync use the responder that was
+registered most recently. gatherRequest asks all of them and
+gives a list of their responses to the future:
+
+    def collectProblems(future):
+        for response in future.result():
+            if response["error"] is None:
+                problems.extend(response["result"])
+
+    SharedRequestCenter().gatherRequest(
+        "Font.Validate",
+        args=(font,),
+        timeout=10,
+        callback=collectProblems
+    )
+
+Each response is a dict with this structure:
+
+    {
+        responder : The responder or None if it has been deallocated.
+         selector : The name of the method that was called.
+           result : The value returned by the responder or None.
+            error : The exception raised by the responder, a
+                    concurrent.futures.TimeoutError if the responder
+                    didn't respond within the timeout or None.
+    }
+
+The thread safe responders run at the same time. The timeout
+applies to each responder separately.
 """
 
+import time
+import heapq
 import weakref
-from booster.notifications import BoosterNotificationMixin
+import inspect
+import itertools
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, CancelledError, InvalidStateError
+from PyObjCTools.AppHelper import callAfter
+from booster.notifications import BoosterNotificationMixin, callOnMainThread
+
+def getDefaultThreadCount():
+    return 4
 
 class BoosterRequestCenter(BoosterNotificationMixin):
 
     def __init__(self):
+        # request : [(responder ref, selector), ...]
         self.responders = {}
+        # (request, responder ref)
+        self._threadSafeResponders = set()
+        self._executor = None
+        self._timeouts = _TimeoutScheduler()
+        self._futureLock = threading.Lock()
+        # futures that are being resolved
+        self._claimedFutures = set()
 
-    def addResponder(self, responder, selector, request):
+    def addResponder(self, responder, selector, request, threadSafe=False):
         """
-        Register a responder for a specific request.
+        Register a responder for a specific request. A responder
+        that is already registered for the request is updated.
 
         responder: an object.
         selector: a string defining the method name to be called.
         request: a string naming the request.
+        threadSafe: a boolean indicating if the responder may be
+                    called on a background thread by postRequestAsync
+                    and gatherRequest. Optional. The default is False.
         """
         responder = weakref.ref(responder)
-        self.responders[request] = (responder, selector)
+        responders = [
+            (other, otherSelector)
+            for other, otherSelector in self.responders.get(request, [])
+            if other != responder
+        ]
+        responders.append((responder, selector))
+        self.responders[request] = responders
+        if threadSafe:
+            self._threadSafeResponders.add((request, responder))
+        else:
+            self._threadSafeResponders.discard((request, responder))
         self.postNotification("BoosterRequestSenter.AddedResponder")
 
-    def removeResponder(self, request):
+    def removeResponder(self, request, responder=None):
         """
         Unregister a responder for a specific request.
 
         request: a string naming the request.
+        responder: the responder to unregister. If this
+                   is None, all responders are unregistered.
         """
-        del self.responders[request]
+        responders = self.responders.pop(request, [])
+        if responder is not None:
+            responder = weakref.ref(responder)
+            remaining = [
+                (other, selector)
+                for other, selector in responders
+                if other != responder
+            ]
+            if remaining:
+                self.responders[request] = remaining
+        for other, selector in responders:
+            if responder is None or other == responder:
+                self._threadSafeResponders.discard((request, other))
         self.postNotification("BoosterRequestSenter.RemovedResponder")
 
+    def _getResponder(self, request):
+        # The most recently registered living responder.
+        for responder, selector in reversed(self.responders.get(request, [])):
+            if responder() is not None:
+                return responder, selector
+        return None
+
     def postRequest(self, request, *args, **kwargs):
         """
         Post a request and get a response if a responder
@@ -75,16 +190,255 @@ class BoosterRequestCenter(BoosterNotificationMixin):
         Any additional args or kwargs will be passed
         to the responder.
         """
-        if request in self.responders:
-            responder, selector = self.responders[request]
-            responder = responder()
-            selector = getattr(responder, selector)
-            value = selector(*args, **kwargs)
+        found = self._getResponder(request)
+        if found is None:
+            return None
+        responder, selector = found
+        return self._callResponder(responder, selector, args, kwargs)
+
+    def _callResponder(self, responder, selector, args, kwargs):
+        responder = responder()
+        if responder is None:
+            return None
+        selector = getattr(responder, selector)
+        return selector(*args, **kwargs)
+
+    def postRequestOnMainThread(self, request, *args, **kwargs):
+        """
+        Post a request on the main thread. This may be
+        called from any thread. This returns a
+        concurrent.futures.Future that will have the
+        response or the exception raised by the responder.
+        A background thread may wait for the response
+        with the future's result method.
+        """
+        future = Future()
+        def post():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self.postRequest(request, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        callOnMainThread(post)
+        return future
+
+    def postRequestAsync(self, request, args=(), kwargs=None, timeout=None, callback=None):
+        """
+        Post a request without waiting for the response.
+        This may be called from any thread.
+
+        request: a string naming the request.
+        args: a tuple of args for the responder. Optional.
+        kwargs: a dict of kwargs for the responder. Optional.
+        timeout: seconds to wait for the response. Optional.
+        callback: a callable that will be called with the
+                  future on the main thread when the future
+                  is done. Optional.
+
+        This returns a concurrent.futures.Future.
+        """
+        found = self._getResponder(request)
+        if found is None:
+            future = Future()
+            future.set_result(None)
+        else:
+            responder, selector = found
+            future = self._postToResponderAsync(request, responder, selector, args, kwargs, timeout)
+        if callback is not None:
+            future.add_done_callback(lambda future: callOnMainThread(callback, future))
+        return future
+
+    def gatherRequest(self, request, args=(), kwargs=None, timeout=None, callback=None):
+        """
+        Post a request to all responders registered for
+        it without waiting for the responses. This may
+        be called from any thread.
+
+        request: a string naming the request.
+        args: a tuple of args for the responders. Optional.
+        kwargs: a dict of kwargs for the responders. Optional.
+        timeout: seconds to wait for each response. Optional.
+        callback: a callable that will be called with the
+                  future on the main thread when the future
+                  is done. Optional.
+
+        This returns a concurrent.futures.Future. Its result
+        is a list of response dicts in the order in which
+        the responders were registered.
+        """
+        gathered = Future()
+        if callback is not None:
+            gathered.add_done_callback(lambda future: callOnMainThread(callback, future))
+        responders = list(self.responders.get(request, []))
+        if not responders:
+            gathered.set_result([])
+            return gathered
+        gathered.set_running_or_notify_cancel()
+        futures = [
+            self._postToResponderAsync(request, responder, selector, args, kwargs, timeout)
+            for responder, selector in responders
+        ]
+        remaining = [len(futures)]
+        lock = threading.Lock()
+        def responseIsDone(future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            responses = []
+            for (responder, selector), future in zip(responders, futures):
+                response = dict(
+                    responder=responder(),
+                    selector=selector,
+                    result=None,
+                    error=None
+                )
+                if future.cancelled():
+                    response["error"] = CancelledError()
+                elif future.exception() is not None:
+                    response["error"] = future.exception()
+                else:
+                    response["result"] = future.result()
+                responses.append(response)
+            gathered.set_result(responses)
+        for future in futures:
+            future.add_done_callback(responseIsDone)
+        return gathered
+
+    def _postToResponderAsync(self, request, responder, selector, args, kwargs, timeout):
+        if kwargs is None:
+            kwargs = {}
+        future = Future()
+        def post():
+            with self._futureLock:
+                # timed out before starting
+                if future.done() or future in self._claimedFutures:
+                    return
+                if not future.set_running_or_notify_cancel():
+                    return
+            try:
+                value = self._callResponder(responder, selector, args, kwargs)
+            except Exception as e:
+                self._resolveFuture(future, exception=e)
+            else:
+                self._resolveFuture(future, value=value)
+        if timeout is not None:
+            def timedOut():
+                error = TimeoutError("No response to %s within %r seconds." % (request, timeout))
+                self._resolveFuture(future, exception=error)
+            entry = self._timeouts.schedule(timeout, timedOut)
+            future.add_done_callback(lambda future: self._timeouts.cancel(entry))
+        if (request, responder) in self._threadSafeResponders:
+            self._getExecutor().submit(post)
         else:
-            value = None
+            # Always call later, even from the main
+            # thread, so the caller is not blocked.
+            callAfter(post)
+        return future
+
+    def _getExecutor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=getDefaultThreadCount(),
+                thread_name_prefix="Booster Request"
+            )
+        return self._executor
+
+    def _resolveFuture(self, future, value=None, exception=None):
+        # The response and the timeout may race. The first one
+        # to claim the future resolves it. The done callbacks
+        # run while it is resolved, so that happens outside of
+        # the lock. They may wait for other requests.
+        with self._futureLock:
+            if future.done() or future in self._claimedFutures:
+                return
+            self._claimedFutures.add(future)
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(value)
+        except InvalidStateError:
+            # cancelled while it was claimed
+            pass
+        finally:
+            with self._futureLock:
+                self._claimedFutures.discard(future)
+
+    async def request(self, request, *args, **kwargs):
+        """
+        Post a request from a coroutine. If the responder
+        is a coroutine function, its result is awaited.
+        See SharedEventLoop.
+        """
+        value = self.postRequest(request, *args, **kwargs)
+        if inspect.isawaitable(value):
+            value = await value
         return value
 
 
+# --------
+# Timeouts
+# --------
+
+class _TimeoutScheduler(object):
+
+    """
+    Calls functions after a delay. All of the request
+    timeouts are run from one thread that waits for
+    the earliest of them.
+    """
+
+    def __init__(self):
+        # [time, order, func]
+        self._heap = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay, func):
+        entry = [time.monotonic() + delay, next(self._order), func]
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="Booster Request Timeouts",
+                    daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        # The entry stays in the heap until its
+        # time comes. Only the function is dropped.
+        with self._condition:
+            entry[2] = None
+
+    def _run(self):
+        heap = self._heap
+        while True:
+            with self._condition:
+                while True:
+                    if not heap:
+                        self._condition.wait()
+                        continue
+                    delay = heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                entry = heapq.heappop(heap)
+                func = entry[2]
+            if func is None:
+                continue
+            try:
+                func()
+            except Exception:
+                traceback.print_exc()
+
+
 # -------------
 # Shared Object
 # -------------
@@ -0,0 +1,294 @@
+"""
+---------------
+SharedTaskQueue
+---------------
+
+This function returns the idle task queue shared by all
+Booster based extensions. The queue runs heavy work while
+the user and the fonts are inactive, in small time slices
+so that the interface stays responsive, and it stops as
+soon as there is new activity.
+
+A task is a generator. Each step of the generator should
+do a small chunk of the work:
+
+    def checkGlyphs(font):
+        problems = []
+        for glyph in font:
+            problems.extend(validate(glyph))
+            yield
+        return problems
+
+    queue = SharedTaskQueue()
+    queue.addTask(checkGlyphs(font), priority=10, callback=showProblems)
+
+The queue calls next() on the highest priority task until
+the task is complete or the per-slice time budget is used.
+Tasks with the same priority run in the order in which
+they were added. When a task is complete, the callback
+is called with the value returned by the generator.
+
+Font changes made by the tasks themselves do not stop
+the queue. Font changes made by anything else do.
+"""
+
+from __future__ import division
+import time
+import heapq
+import traceback
+from Foundation import NSTimer
+from .activity import SharedActivityPoller
+
+# --------
+# Defaults
+# --------
+
+def getDefaultBudget():
+    return 0.02
+
+def getDefaultIdleTime():
+    return 2.0
+
+sliceInterval = 0.01
+
+# ----
+# Task
+# ----
+
+class BoosterTask(object):
+
+    def __init__(self, generator, priority=0, name=None, callback=None):
+        self.generator = generator
+        self.priority = priority
+        if name is None:
+            name = getattr(generator, "__name__", repr(generator))
+        self.name = name
+        self.callback = callback
+        self.steps = 0
+        self.done = False
+        self.cancelled = False
+
+    def __repr__(self):
+        return "<BoosterTask %s priority=%r steps=%d>" % (self.name, self.priority, self.steps)
+
+
+# -----
+# Queue
+# -----
+
+class BoosterTaskQueue(object):
+
+    def __init__(self):
+        self._tasks = []
+        self._counter = 0
+        self._budget = getDefaultBudget()
+        self._idleTime = getDefaultIdleTime()
+        self._observing = False
+        self._timer = None
+        self._fontActivityStamp = None
+        self._completedTasks = 0
+        self._steps = 0
+        self._busyTime = 0
+
+    # -----
+    # Tasks
+    # -----
+
+    def addTask(self, generator, priority=0, name=None, callback=None):
+        """
+        Add a task to the queue.
+
+        generator: a generator. Each step should be a small chunk of work.
+        priority: a number. Higher priorities run first.
+        name: a string naming the task. Optional.
+        callback: a callable that will be called with the
+                  value returned by the generator. Optional.
+
+        This returns a BoosterTask that can be given
+        to removeTask to cancel the task.
+        """
+        task = BoosterTask(generator, priority=priority, name=name, callback=callback)
+        self._counter += 1
+        heapq.heappush(self._tasks, (-priority, self._counter, task))
+        self._startObserving()
+        return task
+
+    def removeTask(self, task):
+        """
+        Cancel a task.
+        """
+        if task.done or task.cancelled:
+            return
+        task.cancelled = True
+        task.generator.close()
+        self._tasks = [entry for entry in self._tasks if entry[2] is not task]
+        heapq.heapify(self._tasks)
+        if not self._tasks:
+            self._stopRunning()
+            self._stopObserving()
+
+    def getTasks(self):
+        """
+        Get the queued tasks in the order in which they will run.
+        """
+        return [entry[2] for entry in sorted(self._tasks)]
+
+    # --------
+    # Settings
+    # --------
+
+    def setBudget(self, value):
+        """
+        Set the number of seconds that tasks may run
+        during one time slice. The default is 0.02.
+        """
+        self._budget = value
+
+    def setIdleTime(self, value):
+        """
+        Set the number of seconds of user and font
+        inactivity required before tasks are run.
+        The default is 2.0.
+        """
+        self._idleTime = value
+        if self._observing:
+            self._stopObserving()
+            self._startObserving()
+
+    # ----------
+    # Statistics
+    # ----------
+
+    def getStatistics(self):
+        """
+        Get a dict with this structure:
+
+            {
+                     depth : The number of queued tasks.
+                   running : Boolean indicating if tasks are being run.
+            completedTasks : The number of completed tasks.
+                     steps : The number of steps that have been run.
+                  busyTime : Seconds spent running steps.
+            stepsPerSecond : Steps run per second of busy time.
+            }
+        """
+        if self._busyTime:
+            stepsPerSecond = self._steps / self._busyTime
+        else:
+            stepsPerSecond = 0
+        return dict(
+            depth=len(self._tasks),
+            running=self._timer is not None,
+            completedTasks=self._completedTasks,
+            steps=self._steps,
+            busyTime=self._busyTime,
+            stepsPerSecond=stepsPerSecond
+        )
+
+    # ----------
+    # Inactivity
+    # ----------
+
+    def _startObserving(self):
+        if self._observing:
+            return
+        self._observing = True
+        SharedActivityPoller().addObserver_(
+            dict(
+                observer=self,
+                selector="_inactivityCallback",
+                sinceUserActivity=self._idleTime,
+                sinceFontActivity=self._idleTime
+            )
+        )
+
+    def _stopObserving(self):
+        if not self._observing:
+            return
+        self._observing = False
+        SharedActivityPoller().removeObserver_(
+            dict(
+                observer=self,
+                selector="_inactivityCallback"
+            )
+        )
+
+    def _inactivityCallback(self, info):
+        self._fontActivityStamp = info["endedFontActivity"]
+        self._startRunning()
+
+    def _activityHasResumed(self):
+        info = SharedActivityPoller().activityInfo()
+        if info["sinceUserActivity"] < self._idleTime:
+            return True
+        if info["endedFontActivity"] != self._fontActivityStamp:
+            return True
+        return False
+
+    # -------
+    # Running
+    # -------
+
+    def _startRunning(self):
+        if self._timer is not None or not self._tasks:
+            return
+        self._timer = NSTimer.scheduledTimerWithTimeInterval_repeats_block_(
+            sliceInterval,
+            True,
+            self._timerCallback
+        )
+
+    def _stopRunning(self):
+        if self._timer is not None:
+            self._timer.invalidate()
+            self._timer = None
+
+    def _timerCallback(self, timer):
+        # Preempt. The inactivity observer will
+        # restart the queue in the next idle period.
+        if self._activityHasResumed():
+            self._stopRunning()
+            return
+        self._runSlice()
+        # Font changes made by the tasks don't count.
+        info = SharedActivityPoller().activityInfo()
+        self._fontActivityStamp = info["endedFontActivity"]
+        if not self._tasks:
+            self._stopRunning()
+            self._stopObserving()
+
+    def _runSlice(self):
+        start = time.time()
+        end = start + self._budget
+        now = start
+        while self._tasks and now < end:
+            task = self._tasks[0][2]
+            try:
+                next(task.generator)
+                task.steps += 1
+                self._steps += 1
+            except StopIteration as e:
+                heapq.heappop(self._tasks)
+                task.done = True
+                self._completedTasks += 1
+                if task.callback is not None:
+                    try:
+                        task.callback(e.value)
+                    except Exception:
+                        traceback.print_exc()
+            except Exception:
+                heapq.heappop(self._tasks)
+                task.done = True
+                traceback.print_exc()
+            now = time.time()
+        self._busyTime += now - start
+
+
+# ----
+# Main
+# ----
+
+_taskQueue = BoosterTaskQueue()
+
+def SharedTaskQueue():
+    return _taskQueue
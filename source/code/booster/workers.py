@@ -0,0 +1,461 @@
+"""
+----------------
+SharedWorkerPool
+----------------
+
+This function returns the worker pool shared by all Booster
+based extensions. The pool runs functions in separate
+processes so that heavy computations do not block RoboFont.
+The worker processes are started the first time they are
+needed and they are reused for all later jobs.
+
+Work is submitted as a function and a list of items. The
+function is called in a worker once for each item:
+
+    def countPoints(glyph):
+        return sum(len(contour) for contour in glyph.contours)
+
+    job = SharedWorkerPool().submit(countPoints, items)
+    job.addObserver(self, "countDidFinish", "bstr.workDidFinish")
+
+The function must be defined at the top level of a module that
+the workers can import. It can't be defined in a scripting
+window. The items, the extra arguments and the results must
+be picklable. Fonts and glyphs can't be sent to the workers.
+Use serializeGlyph and serializeFont to make compact copies
+of their data. BoosterController.submit does this for you.
+
+A job posts these notifications on the main thread:
+
+- bstr.workProgressed
+- bstr.workDidFinish
+- bstr.workWasCancelled
+
+The data for bstr.workProgressed is a dict with this structure:
+
+    {
+            job : The job.
+          index : The index of the item.
+         result : The result for the item. None if there was an error.
+          error : The traceback of the error as a string or None.
+      completed : The number of completed items.
+          total : The total number of items.
+    }
+
+The data for bstr.workDidFinish is a dict with this structure:
+
+    {
+            job : The job.
+        results : A list of results in the order of the items.
+         errors : A dict of {index : traceback} for failed items.
+    }
+
+The data for bstr.workWasCancelled is a dict with this structure:
+
+    {
+        job : The job.
+    }
+
+Cancelling a job stops the items that have not been started
+from being run. Items that are already running in a worker
+finish, but their results are ignored.
+
+The workers are started again for the next job after
+stop, setWorkerCount or setExecutable.
+
+The workers are started with the interpreter given to
+setExecutable. By default this is the Python interpreter that
+RoboFont is running, since sys.executable may be the
+application itself.
+"""
+
+import os
+import sys
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from PyObjCTools.AppHelper import callAfter
+from .notifications import BoosterNotificationMixin
+
+# --------
+# Defaults
+# --------
+
+def getDefaultWorkerCount():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def getDefaultExecutable():
+    if os.path.basename(sys.executable).startswith("python"):
+        return sys.executable
+    path = os.path.join(sys.exec_prefix, "bin", "python%d" % sys.version_info[0])
+    if os.path.exists(path):
+        return path
+    return sys.executable
+
+# items kept in flight per worker for each job
+itemsPerWorker = 2
+
+# -------------
+# Serialization
+# -------------
+
+class GlyphData(object):
+
+    """
+    A compact, picklable copy of a glyph. Contours are tuples
+    of (x, y, segmentType, smooth) points. Components are
+    (baseGlyph, transformation) tuples. Anchors are
+    (name, x, y) tuples.
+    """
+
+    def __init__(self, name, width, height, unicodes, contours, components, anchors):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.unicodes = unicodes
+        self.contours = contours
+        self.components = components
+        self.anchors = anchors
+
+    def __repr__(self):
+        return "<GlyphData %s>" % self.name
+
+    def drawPoints(self, pointPen):
+        for contour in self.contours:
+            pointPen.beginPath()
+            for x, y, segmentType, smooth in contour:
+                pointPen.addPoint((x, y), segmentType=segmentType, smooth=smooth)
+            pointPen.endPath()
+        for baseGlyph, transformation in self.components:
+            pointPen.addComponent(baseGlyph, transformation)
+
+    def draw(self, pen):
+        from fontTools.pens.pointPen import PointToSegmentPen
+        self.drawPoints(PointToSegmentPen(pen))
+
+
+class FontData(object):
+
+    """
+    A compact, picklable copy of a font's default layer
+    and the info attributes listed in fontDataInfoAttributes.
+    """
+
+    def __init__(self, path, info, glyphs):
+        self.path = path
+        self.info = info
+        self.glyphs = glyphs
+
+    def __repr__(self):
+        return "<FontData %s>" % self.path
+
+    def __getitem__(self, name):
+        return self.glyphs[name]
+
+    def __contains__(self, name):
+        return name in self.glyphs
+
+    def __iter__(self):
+        return iter(self.glyphs.values())
+
+    def __len__(self):
+        return len(self.glyphs)
+
+    def keys(self):
+        return self.glyphs.keys()
+
+
+fontDataInfoAttributes = """
+familyName
+styleName
+unitsPerEm
+descender
+xHeight
+capHeight
+ascender
+italicAngle
+""".strip().split()
+
+def serializeGlyph(glyph):
+    """
+    Make a GlyphData from a glyph.
+    """
+    if hasattr(glyph, "naked"):
+        glyph = glyph.naked()
+    contours = tuple(
+        tuple((point.x, point.y, point.segmentType, point.smooth) for point in contour)
+        for contour in glyph
+    )
+    components = tuple(
+        (component.baseGlyph, tuple(component.transformation))
+        for component in glyph.components
+    )
+    anchors = tuple(
+        (anchor.name, anchor.x, anchor.y)
+        for anchor in glyph.anchors
+    )
+    return GlyphData(
+        glyph.name,
+        glyph.width,
+        glyph.height,
+        tuple(glyph.unicodes),
+        contours,
+        components,
+        anchors
+    )
+
+def serializeFont(font, glyphNames=None):
+    """
+    Make a FontData from a font. If glyphNames is
+    given, only those glyphs will be included.
+    """
+    if hasattr(font, "naked"):
+        font = font.naked()
+    if glyphNames is None:
+        glyphNames = font.keys()
+    info = {}
+    for attr in fontDataInfoAttributes:
+        info[attr] = getattr(font.info, attr)
+    glyphs = {}
+    for name in glyphNames:
+        glyphs[name] = serializeGlyph(font[name])
+    return FontData(font.path, info, glyphs)
+
+# ------
+# Worker
+# ------
+
+def _runWorkItem(func, item, args):
+    # This runs in the worker process.
+    try:
+        return True, func(item, *args)
+    except Exception:
+        return False, traceback.format_exc()
+
+# ---
+# Job
+# ---
+
+class BoosterWorkJob(BoosterNotificationMixin):
+
+    def __init__(self, pool, func, items, args, name):
+        if name is None:
+            name = getattr(func, "__name__", repr(func))
+        self.name = name
+        self.total = len(items)
+        self.completed = 0
+        self.results = [None] * self.total
+        self.errors = {}
+        self.done = False
+        self.cancelled = False
+        self._pool = pool
+        self._func = func
+        self._args = args
+        self._pending = deque(enumerate(items))
+        self._inFlight = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<BoosterWorkJob %s %d/%d>" % (self.name, self.completed, self.total)
+
+    def getProgress(self):
+        """
+        Get the completed fraction of the job.
+        """
+        if not self.total:
+            return 1.0
+        return self.completed / float(self.total)
+
+    def cancel(self):
+        """
+        Cancel the job.
+        """
+        self._pool.cancel(self)
+
+
+# ----
+# Pool
+# ----
+
+class BoosterWorkerPool(object):
+
+    def __init__(self):
+        self._pool = None
+        self._workerCount = getDefaultWorkerCount()
+        self._executable = None
+        self._jobs = []
+
+    # --------
+    # Settings
+    # --------
+
+    def setWorkerCount(self, value):
+        """
+        Set the number of worker processes. The default
+        is one less than the number of processors. This
+        stops the workers if they are running.
+        """
+        self._workerCount = value
+        self.stop()
+
+    def setExecutable(self, path):
+        """
+        Set the Python interpreter used for the worker processes.
+        This stops the workers if they are running.
+        """
+        self._executable = path
+        self.stop()
+
+    # -------
+    # Workers
+    # -------
+
+    def _getPool(self):
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            executable = self._executable
+            if executable is None:
+                executable = getDefaultExecutable()
+            context.set_executable(executable)
+            self._pool = context.Pool(processes=self._workerCount)
+        return self._pool
+
+    def stop(self):
+        """
+        Stop the workers. Running jobs are cancelled.
+        """
+        for job in list(self._jobs):
+            self.cancel(job)
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def isRunning(self):
+        """
+        Boolean indicating if the workers have been started.
+        """
+        return self._pool is not None
+
+    # ----
+    # Jobs
+    # ----
+
+    def submit(self, func, items, args=(), name=None):
+        """
+        Run func in the workers for each item.
+
+        func: a function defined at the top level of a module.
+              It will be called with an item and *args.
+        items: a list of picklable items.
+        args: additional picklable arguments. Optional.
+        name: a string naming the job. Optional.
+
+        This returns a BoosterWorkJob.
+        """
+        items = list(items)
+        job = BoosterWorkJob(self, func, items, tuple(args), name)
+        if not items:
+            job.done = True
+            callAfter(job.postNotification, "bstr.workDidFinish", dict(job=job, results=[], errors={}))
+            return job
+        self._getPool()
+        self._jobs.append(job)
+        self._feed(job)
+        return job
+
+    def cancel(self, job):
+        """
+        Cancel a job.
+        """
+        if job.done or job.cancelled:
+            return
+        with job._lock:
+            job.cancelled = True
+            job._pending.clear()
+        if job in self._jobs:
+            self._jobs.remove(job)
+        job.postNotification("bstr.workWasCancelled", dict(job=job))
+
+    def getJobs(self):
+        """
+        Get the jobs that are running.
+        """
+        return list(self._jobs)
+
+    def _feed(self, job):
+        # This is called on the main thread and
+        # on the pool's result handler thread.
+        pool = self._pool
+        if pool is None:
+            return
+        limit = self._workerCount * itemsPerWorker
+        with job._lock:
+            while job._pending and job._inFlight < limit and not job.cancelled:
+                index, item = job._pending.popleft()
+                job._inFlight += 1
+                pool.apply_async(
+                    _runWorkItem,
+                    (job._func, item, job._args),
+                    callback=self._makeItemCallback(job, index),
+                    error_callback=self._makeItemErrorCallback(job, index)
+                )
+
+    def _makeItemCallback(self, job, index):
+        def callback(outcome):
+            self._itemWasRun(job, index, outcome)
+        return callback
+
+    def _makeItemErrorCallback(self, job, index):
+        def callback(error):
+            outcome = (False, "".join(traceback.format_exception_only(type(error), error)))
+            self._itemWasRun(job, index, outcome)
+        return callback
+
+    def _itemWasRun(self, job, index, outcome):
+        # This is called on the pool's result handler thread.
+        with job._lock:
+            job._inFlight -= 1
+            if job.cancelled:
+                return
+        self._feed(job)
+        callAfter(self._itemDidFinish, job, index, outcome)
+
+    def _itemDidFinish(self, job, index, outcome):
+        if job.cancelled:
+            return
+        success, value = outcome
+        if success:
+            job.results[index] = value
+            error = None
+        else:
+            job.errors[index] = value
+            value = None
+            error = job.errors[index]
+        job.completed += 1
+        job.postNotification(
+            "bstr.workProgressed",
+            dict(
+                job=job,
+                index=index,
+                result=value,
+                error=error,
+                completed=job.completed,
+                total=job.total
+            )
+        )
+        if job.completed == job.total:
+            job.done = True
+            if job in self._jobs:
+                self._jobs.remove(job)
+            job.postNotification("bstr.workDidFinish", dict(job=job, results=job.results, errors=job.errors))
+
+
+# ----
+# Main
+# ----
+
+_workerPool = BoosterWorkerPool()
+
+def SharedWorkerPool():
+    return _workerPool
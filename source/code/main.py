@@ -9,6 +9,7 @@ from mojo import events
 from booster.controller import BoosterController
 from booster.activity import SharedActivityPoller
 from booster.requests import SharedRequestCenter
+from booster.tasks import SharedTaskQueue
 
 events.postEvent("Booster.HasLaunched")
 
@@ -30,7 +31,7 @@ class BoosterStatusMonitorController(BoosterController):
         super(BoosterStatusMonitorController, self).stop()
         app = NSApp()
         app.com_typesupply_boosterMonitor = None
-        self.removeResponder("BoosterMonitor.ShowStatusPanel")
+        self.removeResponder("BoosterMonitor.ShowStatusPanel", self)
 
     def showStatusPanelResponder(self):
         if self.statusPanel is None:
@@ -46,6 +47,7 @@ class BoosterStatusMonitorController(BoosterController):
 
 userActivityTemplate = "Seconds since user activity: %.2f"
 fontActivityTemplate = "Seconds since font activity: %.2f"
+taskQueueTemplate = "Queued tasks: %d    Completed tasks: %d    Steps per second: %.1f"
 
 
 class BoosterStatusMonitorPanelController(BaseWindowController):
@@ -53,7 +55,7 @@ class BoosterStatusMonitorPanelController(BaseWindowController):
     def __init__(self, controller):
         self.controller = controller
         self.w = vanilla.FloatingWindow((800, 500), "Booster Status", minSize=(400, 400))
-        self.w.tabs = vanilla.Tabs((15, 15, -15, -15), ["Fonts", "Activity", "Requests"])
+        self.w.tabs = vanilla.Tabs((15, 15, -15, -15), ["Fonts", "Activity", "Tasks", "Requests"])
 
         self.fontsTab.list = vanilla.List(
             (15, 15, -15, -15),
@@ -79,6 +81,17 @@ class BoosterStatusMonitorPanelController(BaseWindowController):
             ]
         )
 
+        self.tasksTab.infoTextBox = vanilla.TextBox((15, 15, -15, 17), taskQueueTemplate % (0, 0, 0))
+        self.tasksTab.list = vanilla.List(
+            (15, 55, -15, -15),
+            [],
+            columnDescriptions=[
+                dict(title="name"),
+                dict(title="priority"),
+                dict(title="steps")
+            ]
+        )
+
         self.requestsTab.list = vanilla.List(
             (15, 15, -15, -15),
             [],
@@ -131,9 +144,14 @@ class BoosterStatusMonitorPanelController(BaseWindowController):
 
     activityTab = property(_get_activityTab)
 
-    def _get_requestsTab(self):
+    def _get_tasksTab(self):
         return self.w.tabs[2]
 
+    tasksTab = property(_get_tasksTab)
+
+    def _get_requestsTab(self):
+        return self.w.tabs[3]
+
     requestsTab = property(_get_requestsTab)
 
     # Fonts
@@ -181,6 +199,7 @@ class BoosterStatusMonitorPanelController(BaseWindowController):
             fontTime = self.inactivityInfo["sinceFontActivity"]
         self.activityTab.userInfoTextBox.set(userActivityTemplate % userTime)
         self.activityTab.fontInfoTextBox.set(fontActivityTemplate % fontTime)
+        self.updateTaskQueueInfo()
         self.startActivityTimer()
 
     def updateActivityObserverList(self, info=None):
@@ -202,24 +221,41 @@ class BoosterStatusMonitorPanelController(BaseWindowController):
             items.append(d)
         self.activityTab.list.set(items)
 
-    # Requests
+    # Tasks
 
-    def updateResponderList(self, notification=None):
-        responders = SharedRequestCenter().responders
+    def updateTaskQueueInfo(self):
+        queue = SharedTaskQueue()
+        statistics = queue.getStatistics()
+        text = taskQueueTemplate % (statistics["depth"], statistics["completedTasks"], statistics["stepsPerSecond"])
+        self.tasksTab.infoTextBox.set(text)
         items = []
-        for request, responder in sorted(responders.items()):
-            responder, selector = responder
-            responder = responder()
-            if responder is not None:
-                responder = responder.__class__.__name__
-            else:
-                responder = "<dead reference>"
+        for task in queue.getTasks():
             d = dict(
-                request=request,
-                responder=responder,
-                selector=selector
+                name=task.name,
+                priority=repr(task.priority),
+                steps=repr(task.steps)
             )
             items.append(d)
+        self.tasksTab.list.set(items)
+
+    # Requests
+
+    def updateResponderList(self, notification=None):
+        responders = SharedRequestCenter().responders
+        items = []
+        for request, requestResponders in sorted(responders.items()):
+            for responder, selector in requestResponders:
+                responder = responder()
+                if responder is not None:
+                    responder = responder.__class__.__name__
+                else:
+                    responder = "<dead reference>"
+                d = dict(
+                    request=request,
+                    responder=responder,
+                    selector=selector
+                )
+                items.append(d)
         self.requestsTab.list.set(items)
 
 